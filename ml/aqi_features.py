@@ -0,0 +1,96 @@
+# FILE: DELHI/ml/aqi_features.py
+"""
+Feature construction for the AQI forecaster, shared by training and
+inference. NumPy only, so the inference path never needs pandas.
+"""
+import numpy as np
+
+N_LAGS = 3
+FEATURE_COLUMNS = ["aqi_lag1", "aqi_lag2", "aqi_lag3", "month_feat", "dayofweek"]
+
+def to_days(dates):
+    """Anything date-like (strings, datetime64, pandas dates) as datetime64[D]."""
+    return np.asarray(dates, dtype="datetime64[D]")
+
+def calendar_features(dates):
+    """(month 1-12, dayofweek Monday=0) for an array of dates."""
+    days = to_days(dates)
+    month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+    # 1970-01-01 was a Thursday
+    dayofweek = (days.astype(np.int64) + 3) % 7
+    return month, dayofweek
+
+def build_training_matrix(dates, aqi):
+    """
+    Lagged design matrix for a daily series sorted by date. Rows without
+    a full set of lags are dropped, like the shift()/dropna() it replaces.
+    Returns (X, y, dates) with X columns in FEATURE_COLUMNS order.
+    """
+    days = to_days(dates)
+    aqi = np.asarray(aqi, dtype=np.float64)
+    month, dayofweek = calendar_features(days)
+
+    lags = [aqi[N_LAGS - k:len(aqi) - k] for k in range(1, N_LAGS + 1)]
+    X = np.column_stack(lags + [month[N_LAGS:], dayofweek[N_LAGS:]]).astype(np.float64)
+    return X, aqi[N_LAGS:], days[N_LAGS:]
+
+def feature_row(recent_aqi, date):
+    """
+    One feature row for date, given the most recent observations oldest
+    first (recent_aqi[-1] is the day before date).
+    """
+    month, dayofweek = calendar_features([date])
+    lags = [recent_aqi[-k] for k in range(1, N_LAGS + 1)]
+    return np.array([lags + [month[0], dayofweek[0]]], dtype=np.float64)
+
+# Direct multi-horizon models share the lag/calendar features and add the
+# number of days between the last observation and the target date.
+DIRECT_FEATURE_COLUMNS = FEATURE_COLUMNS + ["horizon"]
+
+def lag_windows(aqi, origins):
+    """
+    (len(origins), N_LAGS) lag block for each origin index, most recent
+    first, so column k-1 is aqi_lag<k> for the day after the origin.
+    """
+    aqi = np.asarray(aqi, dtype=np.float64)
+    origins = np.asarray(origins, dtype=np.int64)
+    return aqi[origins[:, None] - np.arange(N_LAGS)[None, :]]
+
+def direct_matrix(lags, origin_dates, horizons):
+    """
+    Feature matrix for every (origin, horizon) pair, origin-major: row
+    i * len(horizons) + j forecasts horizons[j] days after origin_dates[i]
+    from lags[i] (as returned by lag_windows).
+    """
+    lags = np.asarray(lags, dtype=np.float64).reshape(-1, N_LAGS)
+    horizons = np.asarray(horizons, dtype=np.int64)
+    n_origins, n_horizons = len(lags), len(horizons)
+
+    targets = (to_days(origin_dates).reshape(-1)[:, None] + horizons[None, :]).ravel()
+    month, dayofweek = calendar_features(targets)
+    return np.column_stack([
+        np.repeat(lags, n_horizons, axis=0),
+        month,
+        dayofweek,
+        np.tile(horizons, n_origins)
+    ]).astype(np.float64)
+
+def build_direct_training_matrix(dates, aqi, max_horizon=7):
+    """
+    Training rows for a direct model covering horizons 1..max_horizon on a
+    daily series sorted by date. Returns (X, y, target_dates) with X
+    columns in DIRECT_FEATURE_COLUMNS order.
+    """
+    days = to_days(dates)
+    aqi = np.asarray(aqi, dtype=np.float64)
+    X_parts, y_parts, date_parts = [], [], []
+    for h in range(1, max_horizon + 1):
+        origins = np.arange(N_LAGS - 1, len(aqi) - h)
+        if not len(origins):
+            continue
+        X_parts.append(direct_matrix(lag_windows(aqi, origins), days[origins], [h]))
+        y_parts.append(aqi[origins + h])
+        date_parts.append(days[origins + h])
+    if not X_parts:
+        return np.empty((0, len(DIRECT_FEATURE_COLUMNS))), np.empty(0), np.empty(0, dtype="datetime64[D]")
+    return np.concatenate(X_parts), np.concatenate(y_parts), np.concatenate(date_parts)
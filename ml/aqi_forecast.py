@@ -0,0 +1,168 @@
+# FILE: DELHI/ml/aqi_forecast.py
+"""
+Inference path for the AQI forecaster. Loads a trained artifact written by
+train_aqi_model.py once per process and predicts on NumPy rows. Never
+imports pandas' Excel stack and never retrains.
+
+Artifacts are either "recursive" (one day-ahead model fed its own
+predictions) or "direct" (a horizon feature, so every horizon for every
+origin is a single batched predict).
+
+    from aqi_forecast import forecast, forecast_many, backfill
+    forecast(days=7)                        # [{"date": "2025-04-01", "aqi": ...}, ...]
+    forecast_many(recent, last_dates)       # (origins, days) array
+    backfill(dates, aqi, start="2024-01-01", end="2024-12-31")
+"""
+import functools
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+from aqi_features import DIRECT_FEATURE_COLUMNS, FEATURE_COLUMNS, N_LAGS, direct_matrix, lag_windows, to_days
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(SCRIPT_DIR, "output", "models")
+LATEST_POINTER = "latest.json"
+
+@dataclass
+class ModelArtifact:
+    version: str
+    booster: object  # xgboost.Booster
+    schema: dict
+
+    @property
+    def strategy(self):
+        return self.schema.get("strategy", "recursive")
+
+    @property
+    def features(self):
+        return DIRECT_FEATURE_COLUMNS if self.strategy == "direct" else FEATURE_COLUMNS
+
+def artifact_paths(model_dir, version):
+    stem = os.path.join(model_dir, f"aqi_xgb_{version}")
+    return stem + ".ubj", stem + ".schema.json"
+
+def resolve_version(model_dir=MODEL_DIR, version="latest"):
+    if version != "latest":
+        return version
+    pointer = os.path.join(model_dir, LATEST_POINTER)
+    if not os.path.exists(pointer):
+        raise FileNotFoundError(f"No trained AQI model in {model_dir}; run train_aqi_model.py first")
+    with open(pointer, "r") as f:
+        return json.load(f)["version"]
+
+@functools.lru_cache(maxsize=8)
+def _load(model_dir, version):
+    import xgboost as xgb
+
+    model_path, schema_path = artifact_paths(model_dir, version)
+    with open(schema_path, "r") as f:
+        schema = json.load(f)
+    booster = xgb.Booster()
+    booster.load_model(model_path)
+    artifact = ModelArtifact(version, booster, schema)
+    if schema["features"] != artifact.features:
+        raise ValueError(f"Model {version} was trained on {schema['features']}, expected {artifact.features}")
+    return artifact
+
+def load_artifact(model_dir=MODEL_DIR, version="latest"):
+    """Loads (and caches) a trained model plus its feature schema."""
+    return _load(model_dir, resolve_version(model_dir, version))
+
+def predict_many(booster, strategy, recent_aqi, last_dates, days=7):
+    """
+    forecast_many for an in-memory booster (e.g. a backtest fold).
+    strategy is "recursive" or "direct".
+    """
+    recent = np.atleast_2d(np.asarray(recent_aqi, dtype=np.float64))
+    if recent.shape[1] < N_LAGS:
+        raise ValueError(f"Need at least {N_LAGS} recent observations per origin, got {recent.shape[1]}")
+    origin_dates = to_days(last_dates).reshape(-1)
+    if len(origin_dates) != len(recent):
+        raise ValueError(f"{len(recent)} origins but {len(origin_dates)} dates")
+    # Most recent first: column k-1 is aqi_lag<k>
+    lags = recent[:, :-N_LAGS - 1:-1]
+
+    if strategy == "direct":
+        X = direct_matrix(lags, origin_dates, np.arange(1, days + 1))
+        return booster.inplace_predict(X).reshape(len(recent), days).astype(np.float64)
+
+    # Recursive: one batched day-ahead predict per step across all origins
+    preds = np.empty((len(recent), days))
+    for step in range(days):
+        X = direct_matrix(lags, origin_dates + step, [1])[:, :len(FEATURE_COLUMNS)]
+        preds[:, step] = booster.inplace_predict(X)
+        lags = np.column_stack([preds[:, step], lags[:, :-1]])
+    return preds
+
+def forecast_many(recent_aqi, last_dates, days=7, model_dir=MODEL_DIR, version="latest"):
+    """
+    Forecasts days 1..days after each origin in one vectorized pass.
+    recent_aqi is (origins, >= N_LAGS) with the latest observation last,
+    last_dates the matching origin dates (one per row, e.g. per station or
+    per historical start date). Returns an (origins, days) float array.
+    """
+    artifact = load_artifact(model_dir, version)
+    if artifact.strategy == "direct" and days > artifact.schema["max_horizon"]:
+        raise ValueError(f"Model {artifact.version} forecasts at most {artifact.schema['max_horizon']} days ahead, asked for {days}")
+    return predict_many(artifact.booster, artifact.strategy, recent_aqi, last_dates, days)
+
+def forecast(days=7, recent_aqi=None, last_date=None, model_dir=MODEL_DIR, version="latest"):
+    """
+    Forecast for the days after last_date. recent_aqi are the latest
+    observations, oldest first; both default to the end of the training
+    series stored in the artifact.
+    """
+    artifact = load_artifact(model_dir, version)
+    history = artifact.schema["last_observations"]
+    recent = recent_aqi if recent_aqi is not None else history["aqi"]
+    last = to_days(last_date if last_date is not None else history["date"])
+
+    preds = forecast_many([recent], [last], days, model_dir, artifact.version)[0]
+    return [
+        {"date": str(last + np.timedelta64(i, "D")), "aqi": round(float(pred), 2)}
+        for i, pred in enumerate(preds, start=1)
+    ]
+
+def backfill(dates, aqi, days=7, start=None, end=None, model_dir=MODEL_DIR, version="latest"):
+    """
+    Historical forecasts issued at every day of a contiguous daily series
+    (optionally limited to origins in [start, end]), in one call. Returns
+    origin_dates (n,), predictions and actual (n, days); actual is NaN
+    past the end of the series.
+    """
+    days_arr = to_days(dates)
+    aqi = np.asarray(aqi, dtype=np.float64)
+    origins = np.arange(N_LAGS - 1, len(aqi))
+    if start is not None:
+        origins = origins[days_arr[origins] >= to_days(start)]
+    if end is not None:
+        origins = origins[days_arr[origins] <= to_days(end)]
+
+    predictions = forecast_many(lag_windows(aqi, origins)[:, ::-1], days_arr[origins], days, model_dir, version)
+    targets = origins[:, None] + np.arange(1, days + 1)[None, :]
+    actual = np.where(targets < len(aqi), aqi[np.minimum(targets, len(aqi) - 1)], np.nan)
+    return {"origin_dates": days_arr[origins], "predictions": predictions, "actual": actual}
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    load_artifact()
+    loaded = time.perf_counter()
+    result = forecast()
+    done = time.perf_counter()
+    print(f"✅ Model loaded in {(loaded - start) * 1000:.0f} ms, 7-day forecast in {(done - loaded) * 1000:.1f} ms")
+    print(json.dumps(result, indent=2))
+
+    from aqi_ingest import load_cpcb_series
+
+    dates, aqi = load_cpcb_series()
+    start = time.perf_counter()
+    hindcast = backfill(dates, aqi, start="2024-01-01", end="2024-12-31")
+    elapsed = time.perf_counter() - start
+    errors = np.abs(hindcast["predictions"] - hindcast["actual"])
+    print(f"✅ Backfilled {hindcast['predictions'].size} forecasts in {elapsed * 1000:.1f} ms | "
+          f"MAE by horizon: {', '.join(f'{m:.1f}' for m in np.nanmean(errors, axis=0))}")
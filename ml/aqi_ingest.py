@@ -0,0 +1,257 @@
+# FILE: DELHI/ml/aqi_ingest.py
+"""
+Ingest stage for CPCB daily AQI exports. Two layouts are understood:
+the pivoted workbooks (Day x Month, one workbook per year) and long
+tables with a "From Date"/"Date" column and an "AQI" column. Each file
+is parsed once into a columnar .npz under ml/cache/; later runs load the
+cached arrays and only re-parse files whose size/mtime and sha256 changed.
+
+    from aqi_ingest import load_cpcb_series, load_long_series
+    dates, aqi = load_cpcb_series()  # datetime64[D], float64
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import zipfile
+
+import numpy as np
+
+import instrumentation
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, "data")
+CACHE_DIR = os.path.join(SCRIPT_DIR, "cache", "aqi")
+LONG_CACHE_DIR = os.path.join(SCRIPT_DIR, "cache", "aqi-long")
+MANIFEST = "manifest.json"
+# Bump when the parser changes so stale caches are rebuilt
+CACHE_FORMAT = 1
+
+# Month mapping
+MONTH_MAP = {
+    'january': 1, 'february': 2, 'march': 3, 'april': 4,
+    'may': 5, 'june': 6, 'july': 7, 'august': 8,
+    'september': 9, 'october': 10, 'november': 11, 'december': 12
+}
+
+def workbook_year(path, default=2025):
+    # Extract year from filename (e.g., ..._2022_...)
+    year_match = re.search(r'202[0-9]', os.path.basename(path))
+    return int(year_match.group()) if year_match else default
+
+def _sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def dates_from_parts(year, month, day):
+    """
+    Vectorized date construction. Returns (dates, valid) where invalid
+    combinations such as 31 February are flagged rather than rolled over.
+    """
+    year, month, day = (np.asarray(a, dtype=np.int64) for a in (year, month, day))
+    month_start = ((year - 1970) * 12 + month - 1).astype("datetime64[M]")
+    dates = month_start.astype("datetime64[D]") + (day - 1)
+    valid = (month >= 1) & (month <= 12) & (day >= 1) & (dates < (month_start + 1).astype("datetime64[D]"))
+    return dates, valid
+
+def parse_cpcb_workbook(path):
+    """
+    Reads one pivoted CPCB workbook into (dates, aqi) arrays in
+    month-major order. Blank cells are dropped; non-numeric entries are
+    kept as NaN so they get interpolated with the rest of the series.
+    """
+    import pandas as pd
+
+    df_raw = pd.read_excel(path)
+    # Clean column names
+    df_raw.columns = [str(c).lower().strip() for c in df_raw.columns]
+    if 'day' not in df_raw.columns:
+        raise ValueError(f"'Day' column missing in {path}")
+
+    # Valid day rows only (1-31); summary rows below the table are text
+    day = pd.to_numeric(df_raw['day'], errors='coerce').to_numpy(dtype=np.float64)
+    rows = ~np.isnan(day)
+    day = day[rows].astype(np.int64)
+
+    month_cols = [c for c in df_raw.columns if c in MONTH_MAP]
+    if not month_cols:
+        return np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64)
+
+    # (days, months) block flattened column by column, like melt()
+    raw = df_raw.loc[rows, month_cols]
+    present = raw.notna().to_numpy().ravel(order="F")
+    values = raw.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64).ravel(order="F")
+    months = np.repeat([MONTH_MAP[c] for c in month_cols], len(day))
+    days = np.tile(day, len(month_cols))
+
+    dates, valid = dates_from_parts(workbook_year(path), months, days)
+    keep = valid & present
+    return dates[keep], values[keep]
+
+DATE_COLUMNS = ("from date", "date")
+
+def parse_long_table(path):
+    """
+    Reads a long CPCB export (one reading per row) into (dates, aqi).
+    Rows without a parseable date or with a blank AQI are dropped.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(path) if path.endswith(".csv") else pd.read_excel(path)
+    df.columns = [str(c).lower().strip() for c in df.columns]
+    date_col = next((c for c in DATE_COLUMNS if c in df.columns), None)
+    if date_col is None or "aqi" not in df.columns:
+        raise ValueError(f"Expected a 'From Date' or 'Date' column and an 'AQI' column in {path}")
+
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    keep = (dates.notna() & df["aqi"].notna()).to_numpy()
+    return (dates.to_numpy(dtype="datetime64[D]")[keep],
+            pd.to_numeric(df["aqi"], errors="coerce").to_numpy(dtype=np.float64)[keep])
+
+class CPCBWorkbookCache:
+    """
+    Per-workbook columnar cache. The manifest maps each workbook name to
+    its size, mtime, sha256 and cached .npz so unchanged files are never
+    re-read and touched-but-identical files only cost a hash. Each parser
+    gets its own cache_dir.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, parser=parse_cpcb_workbook):
+        self.cache_dir = cache_dir
+        self.parser = parser
+        self.manifest_path = os.path.join(cache_dir, MANIFEST)
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return manifest.get("files", {}) if manifest.get("format") == CACHE_FORMAT else {}
+
+    def _write_manifest(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"format": CACHE_FORMAT, "files": self.manifest}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _npz_path(self, entry):
+        return os.path.join(self.cache_dir, entry["npz"])
+
+    def load(self, path):
+        """(dates, aqi) for one workbook, from cache when it is unchanged."""
+        name = os.path.basename(path)
+        stat = os.stat(path)
+        entry = self.manifest.get(name)
+
+        if entry and os.path.exists(self._npz_path(entry)):
+            unchanged = entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+            if not unchanged and entry["size"] == stat.st_size:
+                # Touched (e.g. re-downloaded) but possibly identical
+                unchanged = entry["sha256"] == _sha256(path)
+                if unchanged:
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    self._write_manifest()
+            if unchanged:
+                try:
+                    with np.load(self._npz_path(entry)) as cached:
+                        dates, aqi = cached["dates"], cached["aqi"]
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                    print(f"⚠️ Cache for {name} unreadable, re-parsing: {e}")
+                else:
+                    instrumentation.count("aqi.files_from_cache")
+                    return dates, aqi
+
+        print(f"Processing {path}")
+        instrumentation.count("aqi.files_parsed")
+        with instrumentation.span("aqi.parse"):
+            dates, aqi = self.parser(path)
+        sha256 = _sha256(path)
+        entry = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": sha256,
+            "npz": f"{os.path.splitext(name)[0]}-{sha256[:12]}.npz",
+            "rows": int(len(aqi))
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        np.savez(self._npz_path(entry), dates=dates, aqi=aqi)
+
+        old = self.manifest.get(name)
+        if old and old["npz"] != entry["npz"] and os.path.exists(self._npz_path(old)):
+            os.remove(self._npz_path(old))
+        self.manifest[name] = entry
+        self._write_manifest()
+        return dates, aqi
+
+def load_series(files, parser, cache_dir=None):
+    """
+    Date-sorted daily (dates, aqi) arrays from files. Non-numeric readings
+    are linearly interpolated, leading gaps dropped, and several readings
+    on one day averaged.
+    """
+    cache = CPCBWorkbookCache(cache_dir, parser) if cache_dir else None
+    parts = []
+    for file in files:
+        try:
+            parts.append(cache.load(file) if cache else parser(file))
+        except Exception as e:
+            print(f"⚠️ Error reading {file}: {e}")
+
+    if not any(len(aqi) for _, aqi in parts):
+        raise ValueError("❌ No valid data extracted from files!")
+
+    dates = np.concatenate([d for d, _ in parts])
+    aqi = np.concatenate([a for _, a in parts])
+    order = np.argsort(dates, kind="stable")
+    dates, aqi = dates[order], aqi[order]
+    print("🔹 Total records:", len(aqi))
+    instrumentation.count("aqi.rows_ingested", len(aqi))
+
+    # Interpolate missing values between readings; leading gaps have nothing to fill from
+    missing = np.isnan(aqi)
+    if missing.any():
+        known = np.flatnonzero(~missing)
+        if not len(known):
+            raise ValueError("❌ No valid data extracted from files!")
+        idx = np.arange(len(aqi))
+        aqi[missing] = np.interp(idx[missing], known, aqi[known])
+        keep = idx >= known[0]
+        dates, aqi = dates[keep], aqi[keep]
+
+    # Sub-daily exports: one mean per day
+    days, first, counts = np.unique(dates, return_index=True, return_counts=True)
+    if len(days) < len(dates):
+        aqi = np.add.reduceat(aqi, first) / counts
+        dates = days
+    instrumentation.count("aqi.days", len(aqi))
+    return dates, aqi
+
+def load_cpcb_series(data_dir=DATA_DIR, cache_dir=CACHE_DIR, use_cache=True):
+    """Daily city-level AQI from every pivoted workbook in data_dir."""
+    print("🔹 Loading Excel files...")
+    files = sorted(glob.glob(os.path.join(data_dir, "*.xlsx")))
+    if not files:
+        raise FileNotFoundError("❌ No Excel files found in data/ folder!")
+    return load_series(files, parse_cpcb_workbook, cache_dir if use_cache else None)
+
+def load_long_series(data_dir=DATA_DIR, cache_dir=LONG_CACHE_DIR, use_cache=True):
+    """Daily AQI from every long-format .xlsx/.csv export in data_dir."""
+    print("🔹 Loading CPCB exports...")
+    files = sorted(glob.glob(os.path.join(data_dir, "*.xlsx")) + glob.glob(os.path.join(data_dir, "*.csv")))
+    if not files:
+        raise FileNotFoundError("❌ No Excel or CSV files found in data/ folder!")
+    return load_series(files, parse_long_table, cache_dir if use_cache else None)
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    dates, aqi = load_cpcb_series()
+    print(f"✅ {len(aqi)} days ({dates[0]} to {dates[-1]}) loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
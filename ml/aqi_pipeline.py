@@ -0,0 +1,142 @@
+# FILE: DELHI/ml/aqi_pipeline.py
+"""
+Single entry point for AQI model training and forecasting, whichever shape
+the CPCB export comes in. Loaders turn a data directory into a daily
+(dates, aqi) series; everything after that (features, training, artifact,
+forecast output) is shared.
+
+    python ml/aqi_pipeline.py                          # auto-detect ml/data
+    python ml/aqi_pipeline.py --loader long --data-dir exports/
+    python ml/aqi_pipeline.py --strategy direct --incremental
+
+ml/train_aqi_model.py and ml/data/train_aqi_model.py are thin wrappers
+around main().
+"""
+import argparse
+import glob
+import json
+import os
+
+import instrumentation
+from aqi_forecast import forecast, load_artifact
+from aqi_ingest import DATA_DIR, DATE_COLUMNS, MONTH_MAP, load_cpcb_series, load_long_series
+from train_aqi_model import MODEL_PARAMS, full_retrain, retrain_plan, save_artifact, warm_start
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
+
+# name -> (loader(data_dir) -> (dates, aqi), data_source label)
+LOADERS = {
+    "cpcb-pivot": (load_cpcb_series, "CPCB AQI (Excel Pivoted Format)"),
+    "long": (load_long_series, "CPCB AQI (From Date / AQI columns)")
+}
+
+def _header(path):
+    import pandas as pd
+
+    frame = pd.read_csv(path, nrows=0) if path.endswith(".csv") else pd.read_excel(path, nrows=0)
+    return [str(c).lower().strip() for c in frame.columns]
+
+def detect_loader(data_dir=DATA_DIR):
+    """Picks a loader from the header of the first export in data_dir."""
+    files = sorted(glob.glob(os.path.join(data_dir, "*.xlsx")) + glob.glob(os.path.join(data_dir, "*.csv")))
+    if not files:
+        raise FileNotFoundError(f"❌ No Excel or CSV files found in {data_dir}!")
+    columns = _header(files[0])
+    if "day" in columns and any(c in MONTH_MAP for c in columns):
+        return "cpcb-pivot"
+    if "aqi" in columns and any(c in DATE_COLUMNS for c in columns):
+        return "long"
+    raise ValueError(f"❌ Unrecognised CPCB layout in {files[0]}: {columns}")
+
+def load(data_dir=DATA_DIR, loader="auto"):
+    """(dates, aqi, data_source) for data_dir using the named or detected loader."""
+    if loader == "auto":
+        loader = detect_loader(data_dir)
+    load_fn, data_source = LOADERS[loader]
+    with instrumentation.span("aqi.ingest"):
+        dates, aqi = load_fn(data_dir)
+    return dates, aqi, data_source
+
+def write_forecast(forecast_results, data_source=LOADERS["cpcb-pivot"][1], output_dir=OUTPUT_DIR):
+    output = {
+        "model": "XGBoost Regression",
+        "data_source": data_source,
+        "forecast_days": len(forecast_results),
+        "aqi_forecast": forecast_results
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, "aqi_forecast.json")
+
+    with open(output_path, "w") as f:
+        json.dump(output, f, indent=2)
+
+    print(f"🎉 Forecast saved to {os.path.relpath(output_path, SCRIPT_DIR)}")
+
+def train_and_forecast(dates, aqi, data_source, strategy="recursive", horizons=7, incremental=False,
+                       output_dir=OUTPUT_DIR, params=MODEL_PARAMS):
+    """(Re)train on a loaded series, save the artifact and write the forecast. Returns the model version."""
+    max_horizon = horizons if strategy == "direct" else None
+    previous = None
+    if incremental:
+        try:
+            previous = load_artifact()
+        except FileNotFoundError:
+            pass
+    mode, reason = retrain_plan(previous, dates, aqi, params, strategy, max_horizon)
+    print(f"🔹 Training mode: {mode} ({reason})")
+
+    result = None
+    if mode == "skip":
+        version = previous.version
+    else:
+        with instrumentation.span(f"aqi.training.{mode}"):
+            if mode == "incremental":
+                result = warm_start(previous, dates, aqi, params, strategy, max_horizon)
+            if result is None:
+                result = full_retrain(dates, aqi, params, strategy, horizons)
+        booster, n_rows, info = result
+        instrumentation.count("aqi.training_rows", n_rows)
+        version = save_artifact(booster, dates, aqi, n_rows, params, strategy=strategy,
+                                max_horizon=max_horizon, data_source=data_source, **info)
+
+    # ----------------------
+    # Forecast Next 7 Days
+    # ----------------------
+    print("🔹 Generating forecast...")
+    with instrumentation.span("aqi.forecast"):
+        write_forecast(forecast(days=min(7, max_horizon or 7), version=version), data_source, output_dir)
+    return version
+
+def run(data_dir=DATA_DIR, loader="auto", **options):
+    """Load -> train_and_forecast."""
+    return train_and_forecast(*load(data_dir, loader), **options)
+
+def main(argv=None, data_dir=DATA_DIR, loader="auto"):
+    parser = argparse.ArgumentParser(description="Train the XGBoost AQI forecaster on CPCB exports.")
+    parser.add_argument("--data-dir", default=data_dir)
+    parser.add_argument("--loader", choices=["auto"] + sorted(LOADERS), default=loader,
+                        help="cpcb-pivot: Day x Month workbooks; long: From Date/AQI rows")
+    parser.add_argument("--strategy", choices=["recursive", "direct"], default="recursive",
+                        help="recursive day-ahead model, or one direct model with a horizon feature")
+    parser.add_argument("--horizons", type=int, default=7, help="days ahead covered by a direct model")
+    parser.add_argument("--incremental", action="store_true",
+                        help="warm-start the latest model on new days instead of training from scratch")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    args = parser.parse_args(argv)
+
+    try:
+        # Parsed exports are cached under ml/cache/; only changed files are re-read
+        dates, aqi, data_source = load(args.data_dir, args.loader)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+        exit(1)
+
+    version = train_and_forecast(dates, aqi, data_source, args.strategy, args.horizons, args.incremental,
+                                 args.output_dir)
+    # DELHI_METRICS=1 writes a run report to output/reports/aqi_pipeline.json
+    instrumentation.write_report("aqi_pipeline", model_version=version, strategy=args.strategy)
+
+if __name__ == "__main__":
+    main()
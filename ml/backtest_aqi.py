@@ -0,0 +1,173 @@
+# FILE: DELHI/ml/backtest_aqi.py
+"""
+Rolling-origin backtest and hyperparameter search for the AQI forecaster.
+
+Every configuration is trained once per fold on all days up to the fold's
+cutoff, then asked for a forecast from each of the following --step-days
+origins. Errors are reported per horizon along with training time and
+per-origin inference latency. (configuration, fold) jobs run in parallel
+across cores, with XGBoost pinned to one thread per job.
+
+    python ml/backtest_aqi.py --folds 6 --step-days 30
+    python ml/backtest_aqi.py --grid '{"max_depth": [3, 5], "strategy": ["direct"]}'
+
+Results are written to output/backtest_aqi.json. Configurations that no
+other configuration beats on both MAE and total latency are flagged as
+the accuracy/latency frontier.
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aqi_features import N_LAGS, lag_windows, to_days
+from aqi_forecast import predict_many
+from train_aqi_model import MODEL_PARAMS, fit_booster, training_rows
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(SCRIPT_DIR, "output", "backtest_aqi.json")
+
+DEFAULT_GRID = {
+    "strategy": ["recursive", "direct"],
+    "n_estimators": [100, 300],
+    "max_depth": [3, 5, 7],
+    "learning_rate": [0.05, 0.1]
+}
+
+def expand_grid(grid):
+    """Every combination of the grid's values as a list of dicts."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def fold_cutoffs(dates, n_folds, step_days):
+    """Cutoff dates for the last n_folds windows of step_days each, oldest first."""
+    last = to_days(dates[-1])
+    return [last - step_days * k for k in range(n_folds, 0, -1)]
+
+def run_fold(dates, aqi, config, cutoff, step_days, horizons):
+    """
+    Trains config on days up to cutoff and forecasts from every origin in
+    (cutoff, cutoff + step_days]. Returns per-origin absolute errors
+    (origins, horizons, NaN where the target is past the series) and
+    timings.
+    """
+    config = dict(config)
+    strategy = config.pop("strategy", "recursive")
+    params = {**MODEL_PARAMS, **config, "n_jobs": 1}
+    days = to_days(dates)
+
+    X, y, targets, features = training_rows(dates, aqi, strategy, horizons)
+    train = targets <= cutoff
+    start = time.perf_counter()
+    booster = fit_booster(X[train], y[train], features, params)
+    train_s = time.perf_counter() - start
+
+    origins = np.flatnonzero((days > cutoff) & (days <= cutoff + step_days))
+    origins = origins[origins >= N_LAGS - 1]
+    start = time.perf_counter()
+    preds = predict_many(booster, strategy, lag_windows(aqi, origins)[:, ::-1], days[origins], horizons)
+    predict_s = time.perf_counter() - start
+
+    target_idx = origins[:, None] + np.arange(1, horizons + 1)[None, :]
+    actual = np.where(target_idx < len(aqi), aqi[np.minimum(target_idx, len(aqi) - 1)], np.nan)
+    return {
+        "errors": preds - actual,
+        "train_s": train_s,
+        "predict_s": predict_s,
+        "origins": len(origins)
+    }
+
+def _fold_job(job):
+    dates, aqi, config, cutoff, step_days, horizons = job
+    return run_fold(dates, aqi, config, cutoff, step_days, horizons)
+
+def summarise(config, folds):
+    errors = np.concatenate([f["errors"] for f in folds])
+    origins = sum(f["origins"] for f in folds)
+    mae = np.nanmean(np.abs(errors), axis=0)
+    rmse = np.sqrt(np.nanmean(errors ** 2, axis=0))
+    return {
+        "config": config,
+        "mae": round(float(np.nanmean(np.abs(errors))), 3),
+        "rmse": round(float(np.sqrt(np.nanmean(errors ** 2))), 3),
+        "mae_by_horizon": [round(float(v), 3) for v in mae],
+        "rmse_by_horizon": [round(float(v), 3) for v in rmse],
+        "train_s_per_fold": round(float(np.mean([f["train_s"] for f in folds])), 4),
+        "predict_us_per_origin": round(1e6 * sum(f["predict_s"] for f in folds) / max(origins, 1), 2),
+        "folds": len(folds),
+        "origins": origins
+    }
+
+def mark_frontier(results):
+    """Flags results not dominated on (mae, train + inference latency)."""
+    def cost(r):
+        return r["train_s_per_fold"] + r["predict_us_per_origin"] * 1e-6
+
+    for r in results:
+        r["frontier"] = not any(
+            o is not r and o["mae"] <= r["mae"] and cost(o) <= cost(r)
+            and (o["mae"] < r["mae"] or cost(o) < cost(r))
+            for o in results
+        )
+    return results
+
+def backtest(dates, aqi, grid=DEFAULT_GRID, n_folds=6, step_days=30, horizons=7, workers=None):
+    """Runs every grid configuration over every fold; returns summaries sorted by MAE."""
+    configs = expand_grid(grid)
+    cutoffs = fold_cutoffs(dates, n_folds, step_days)
+    jobs = [(dates, aqi, config, cutoff, step_days, horizons) for config in configs for cutoff in cutoffs]
+
+    workers = workers or os.cpu_count()
+    print(f"🔹 {len(configs)} configurations x {len(cutoffs)} folds = {len(jobs)} fits on {workers} workers...")
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fold_results = list(pool.map(_fold_job, jobs))
+    else:
+        fold_results = [_fold_job(job) for job in jobs]
+
+    results = [
+        summarise(config, fold_results[i * len(cutoffs):(i + 1) * len(cutoffs)])
+        for i, config in enumerate(configs)
+    ]
+    return sorted(mark_frontier(results), key=lambda r: r["mae"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folds", type=int, default=6)
+    parser.add_argument("--step-days", type=int, default=30)
+    parser.add_argument("--horizons", type=int, default=7)
+    parser.add_argument("--workers", type=int, default=None, help="parallel fits (default: all cores)")
+    parser.add_argument("--grid", type=json.loads, default=DEFAULT_GRID, help="JSON dict of parameter lists")
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    from aqi_ingest import load_cpcb_series
+
+    dates, aqi = load_cpcb_series()
+    start = time.perf_counter()
+    results = backtest(dates, aqi, args.grid, args.folds, args.step_days, args.horizons, args.workers)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'MAE':>8} {'RMSE':>8} {'train s':>8} {'us/orig':>8}  frontier  config")
+    for r in results:
+        print(f"{r['mae']:>8.2f} {r['rmse']:>8.2f} {r['train_s_per_fold']:>8.3f} {r['predict_us_per_origin']:>8.1f}  "
+              f"{'*' if r['frontier'] else ' ':^8}  {json.dumps(r['config'], sort_keys=True)}")
+
+    os.makedirs(os.path.dirname(args.out), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump({
+            "folds": args.folds,
+            "step_days": args.step_days,
+            "horizons": args.horizons,
+            "series_end": str(dates[-1]),
+            "elapsed_s": round(elapsed, 2),
+            "results": results
+        }, f, indent=2)
+    print(f"🎉 Backtest of {len(results)} configurations finished in {elapsed:.1f}s, saved to {os.path.relpath(args.out, SCRIPT_DIR)}")
+
+if __name__ == "__main__":
+    main()
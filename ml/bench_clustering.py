@@ -0,0 +1,46 @@
+# FILE: DELHI/ml/bench_clustering.py
+"""
+Benchmarks grid-indexed fire clustering against the original O(n^2) scan.
+
+    python ml/bench_clustering.py --sizes 1000 10000 100000
+
+The naive scan is skipped above --naive-limit points since it takes hours
+at 100k.
+"""
+import argparse
+import time
+
+from fire_clustering import label_components, label_components_naive
+from fire_engine import SatelliteFireDetector
+
+def _time(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+def _canonical(components):
+    return sorted(tuple(sorted(c)) for c in components)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--radius-km", type=float, default=20)
+    parser.add_argument("--naive-limit", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'grid (s)':>10} {'naive (s)':>10} {'speedup':>8} {'clusters':>9}  match")
+    for n in args.sizes:
+        fires = SatelliteFireDetector().simulate_bulk_fires(n, seed=args.seed)
+        grid_s, grid = _time(label_components, fires, args.radius_km)
+
+        if n <= args.naive_limit:
+            # The reference scan only understands per-fire dicts
+            naive_s, naive = _time(label_components_naive, fires.to_records(), args.radius_km)
+            match = "yes" if _canonical(grid) == _canonical(naive) else "NO"
+            print(f"{n:>8} {grid_s:>10.3f} {naive_s:>10.3f} {naive_s / grid_s:>7.1f}x {len(grid):>9}  {match}")
+        else:
+            print(f"{n:>8} {grid_s:>10.3f} {'skipped':>10} {'-':>8} {len(grid):>9}  -")
+
+if __name__ == "__main__":
+    main()
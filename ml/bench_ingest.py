@@ -0,0 +1,50 @@
+# FILE: DELHI/ml/bench_ingest.py
+"""
+Benchmarks streaming FIRMS CSV ingest on simulated feeds.
+
+    python ml/bench_ingest.py --sizes 100000 1000000
+
+Each size is written once as a FIRMS-style CSV by the bulk simulator and
+then parsed by read_firms_csv, with and without the Punjab/Haryana filter.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from fire_engine import SatelliteFireDetector, write_firms_csv
+from firms_ingest import PUNJAB_HARYANA_BBOX, read_firms_csv
+
+def _peak_memory(path, bbox, min_confidence):
+    """Peak traced allocation (bytes) of one parse, and the rows it kept."""
+    tracemalloc.start()
+    try:
+        fires = read_firms_csv(path, bbox=bbox, min_confidence=min_confidence)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak, len(fires)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    detector = SatelliteFireDetector()
+    print(f"{'rows':>9} {'filter':>8} {'kept':>9} {'parse (s)':>10} {'rows/s':>11} {'peak MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"firms_{n}.csv")
+            write_firms_csv(detector.simulate_bulk_fires(n, seed=args.seed), path)
+            for label, bbox, min_conf in (("none", None, -1), ("punjab", PUNJAB_HARYANA_BBOX, 70)):
+                # tracemalloc slows parsing, so time a clean run separately
+                start = time.perf_counter()
+                read_firms_csv(path, bbox=bbox, min_confidence=min_conf)
+                elapsed = time.perf_counter() - start
+                peak, kept = _peak_memory(path, bbox, min_conf)
+                print(f"{n:>9} {label:>8} {kept:>9} {elapsed:>10.2f} {n / elapsed:>11,.0f} {peak / 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,178 @@
-
-from fastapi import FastAPI, HTTPException
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from causal_inference import CausalEngine
+from typing import List, Optional
+from causal_inference import MIN_SEGMENT_ROWS, CausalEngine, estimate_for, refute_for
+from causal_cache import CausalResultsCache
+from causal_executor import ExecutorBusy, InferenceExecutor, JobStore
+import sys
+import time
 import uvicorn
 import os
 
-app = FastAPI(title="Delhi Pollution Causal API")
+# ml/instrumentation.py lives one level up; appended so ml/ cannot shadow
+# stdlib or installed packages
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation
+
+# The API collects metrics unless DELHI_METRICS=0
+if os.environ.get("DELHI_METRICS", "1") == "1":
+    instrumentation.enable()
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data.csv")
 
-# Initialize Engine
-# In production, we'd cache this or run it periodically
-engine = None
+# Worker processes for inference; health/confounder endpoints never touch them
+MAX_INFERENCE_WORKERS = 2
+MAX_QUEUED_COMPUTATIONS = 8
+# Refutations run inside an inference worker, so they stay in that process
+# instead of starting a nested pool
+REFUTATION_WORKERS = 1
+
+logger = logging.getLogger(__name__)
 
 def get_engine():
-    global engine
-    if engine is None:
-        # Ensure we are in the right directory to find sample_data.csv
-        os.chdir(os.path.dirname(os.path.abspath(__file__)))
-        engine = CausalEngine()
-    return engine
+    return CausalEngine(DATA_PATH)
+
+# Inference runs once per dataset/config; requests are served from memory
+results_cache = CausalResultsCache(get_engine, DATA_PATH)
+executor = InferenceExecutor(MAX_INFERENCE_WORKERS, MAX_QUEUED_COMPUTATIONS)
+jobs = JobStore()
+
+# Cached part -> (worker entry point, extra arguments after DATA_PATH)
+PART_COMPUTATIONS = {
+    "inference": (estimate_for, ()),
+    "refutation": (refute_for, (REFUTATION_WORKERS,))
+}
+
+async def compute_part(part: str, force: bool = False):
+    """
+    Computes one cached part in the worker pool and caches it. Identical
+    in-flight requests (same part and dataset/config key) share one
+    computation.
+    """
+    if not force:
+        results = results_cache.cached(part)
+        if results is not None:
+            return results
+    key = await run_in_threadpool(results_cache.current_key)
+    fn, args = PART_COMPUTATIONS[part]
+    start = time.perf_counter()
+    results = await executor.run((part, key), fn, DATA_PATH, *args)
+    elapsed = time.perf_counter() - start
+    if results_cache.cached(part) is results:
+        # Coalesced onto a computation another caller already stored and timed
+        return results
+    results_cache.store(key, results, elapsed, part)
+    # Stages ran in a worker process, so their timings come back with the results
+    instrumentation.record(f"causal.compute.{part}", elapsed)
+    for stage, seconds in results.get("stage_seconds", {}).items():
+        instrumentation.record(f"causal.{stage}", seconds)
+    return results
+
+async def compute_results(force: bool = False):
+    """The effect estimate and its bootstrap interval (seconds to compute)."""
+    return await compute_part("inference", force)
+
+async def compute_refutations(force: bool = False):
+    """The refutation suite (up to REFUTATION_TIME_BUDGET_S to compute)."""
+    return await compute_part("refutation", force)
+
+async def get_results(compute=compute_results):
+    try:
+        return await compute()
+    except ExecutorBusy as e:
+        raise HTTPException(status_code=503, detail=f"Causal inference busy: {e}")
+
+# Startup warm-up state, reported by /ready
+warmup = {"status": "pending", "started_at": None, "finished_at": None, "error": None}
+
+async def warm_up():
+    """
+    Loads the data and precomputes the estimate and the scenario model so
+    the first real request is served from memory. Runs in the background;
+    /ready reports 503 until it has finished. The refutation suite is not
+    part of readiness: it is submitted as a job once the worker is ready.
+    """
+    warmup.update(status="running", started_at=time.time())
+    try:
+        await compute_results()
+        await run_in_threadpool(lambda: results_cache.engine().scenario_model())
+    except Exception as e:
+        # Requests still compute on demand; readiness stays down so the
+        # orchestrator can restart the worker
+        logger.exception("Causal API warm-up failed")
+        warmup.update(status="failed", error=str(e))
+    else:
+        warmup.update(status="ready")
+        jobs.submit("refutation", ("refutation", False), compute_refutations)
+    finally:
+        warmup["finished_at"] = time.time()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve /health immediately; heavy imports and inference happen in the warm-up
+    task = asyncio.create_task(warm_up())
+    yield
+    task.cancel()
+    executor.shutdown()
+
+app = FastAPI(title="Delhi Pollution Causal API", lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request, call_next):
+    """Per-endpoint latency and status counts for /metrics."""
+    if not instrumentation.enabled():
+        return await call_next(request)
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Route template, so /causal/jobs/{job_id} is one series
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    instrumentation.record(f"http {request.method} {path}", time.perf_counter() - start)
+    instrumentation.count(f"http.status.{response.status_code}")
+    return response
 
 class InterventionRequest(BaseModel):
     fire_reduction_percent: float
 
+class Scenario(BaseModel):
+    fire_reduction_percent: float = 0.0
+    traffic_change_percent: float = 0.0
+    wind_direction: Optional[str] = None
+
+class ScenarioBatchRequest(BaseModel):
+    scenarios: List[Scenario]
+
+class JobRequest(BaseModel):
+    kind: str = "inference"
+    force: bool = False
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "inference_in_flight": executor.inflight}
+
+@app.get("/ready")
+async def ready():
+    if warmup["status"] != "ready":
+        raise HTTPException(status_code=503, detail=warmup)
+    return warmup
+
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        **instrumentation.snapshot(),
+        "inference_in_flight": executor.inflight,
+        "cache": results_cache.status(),
+        "warmup": warmup
+    }
+
 @app.get("/causal/fire-impact")
 async def get_fire_impact():
     try:
-        results = get_engine().run_inference()
+        results = await get_results()
         return {
             "intervention": "eliminate_all_fires",
             "current_avg_aqi": results["current_avg_aqi"],
@@ -36,13 +183,15 @@ async def get_fire_impact():
             "p_value": results["p_value"],
             "interpretation": f"Eliminating crop fires would causally reduce average AQI by {results['total_impact']} points."
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/causal/custom-intervention")
 async def post_intervention(request: InterventionRequest):
     try:
-        results = get_engine().run_inference()
+        results = await get_results()
         reduction_factor = request.fire_reduction_percent / 100.0
         impact = results["total_impact"] * reduction_factor
         
@@ -55,17 +204,109 @@ async def post_intervention(request: InterventionRequest):
                 round(-results["confidence_interval"][0] * reduction_factor, 1)
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/causal/scenarios")
+async def post_scenarios(request: ScenarioBatchRequest):
+    """
+    Evaluates a whole batch of interventions (e.g. every slider position)
+    in one vectorised pass against the fitted effect model, with bootstrap
+    intervals. aqi_reduction and its confidence_interval are in AQI points.
+    """
+    scenarios = [s.model_dump(exclude_none=True) for s in request.scenarios]
+
+    def evaluate():
+        return results_cache.engine().evaluate_scenarios(scenarios)
+
+    try:
+        return await run_in_threadpool(evaluate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/causal/confounders")
 async def get_confounders():
     return {"controlled_variables": ["wind_speed", "wind_direction", "temperature_c", "humidity_percent", "day_of_week", "traffic_density"]}
 
 @app.get("/causal/refutation-tests")
 async def get_refutation():
-    results = get_engine().run_inference()
+    # Served from cache once the post-warm-up job is done; before that this
+    # waits on it (bounded by REFUTATION_TIME_BUDGET_S)
+    results = await get_results(compute_refutations)
     return results["refutation_tests"]
 
+@app.get("/causal/segment-effects")
+async def get_segment_effects(by: List[str] = Query(["wind_direction"]),
+                              wind_direction: Optional[str] = None,
+                              month: Optional[int] = None,
+                              district: Optional[str] = None,
+                              min_rows: int = Query(MIN_SEGMENT_ROWS, ge=1)):
+    """
+    Effect of fires on AQI per segment (e.g. ?by=wind_direction&by=month).
+    wind_direction/month/district keep only matching segments; all
+    segments are fitted and cached together, so filtering is free.
+    """
+    # Validate everything before fitting anything
+    filters = {k: v for k, v in (("wind_direction", wind_direction), ("month", month), ("district", district))
+               if v is not None}
+    unfiltered = [k for k in filters if k not in by]
+    if unfiltered:
+        raise HTTPException(status_code=400, detail=f"Filters {unfiltered} need matching 'by' columns")
+    engine = await run_in_threadpool(results_cache.engine)
+    available = engine.segment_columns()
+    unknown = [c for c in by if c not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot segment by {unknown}; available: {available}")
+
+    try:
+        effects = await run_in_threadpool(engine.effects_by_segment, by, min_rows)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def matches(entry):
+        return all(entry["segment"][k] == v for k, v in filters.items())
+
+    return {
+        **effects,
+        "filters": filters,
+        "segments": [s for s in effects["segments"] if matches(s)],
+        "skipped": [s for s in effects["skipped"] if matches(s)]
+    }
+
+@app.get("/causal/cache")
+async def get_cache_status():
+    return results_cache.status()
+
+@app.post("/causal/cache/invalidate")
+async def invalidate_cache(background_tasks: BackgroundTasks, recompute: bool = True):
+    results_cache.invalidate()
+    if recompute:
+        background_tasks.add_task(compute_results)
+        background_tasks.add_task(compute_refutations)
+    return {"invalidated": True, "recomputing": recompute}
+
+JOB_KINDS = {
+    "inference": compute_results,
+    "refutation": compute_refutations
+}
+
+@app.post("/causal/jobs", status_code=202)
+async def submit_job(request: JobRequest):
+    if request.kind not in JOB_KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{request.kind}', expected one of {sorted(JOB_KINDS)}")
+    work = JOB_KINDS[request.kind]
+    job = jobs.submit(request.kind, (request.kind, request.force), lambda: work(force=request.force))
+    return job.to_dict()
+
+@app.get("/causal/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job.to_dict()
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     uvicorn.run(app, host="0.0.0.0", port=8000)
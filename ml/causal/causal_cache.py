@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Cached parts -> the CausalEngine method that computes each in-process
+PARTS = {
+    "inference": "estimate",
+    "refutation": "refute"
+}
+
+class CausalResultsCache:
+    """
+    Keeps CausalEngine results in memory, keyed by the engine's
+    fingerprint (dataset hash + graph/method configuration). Each part in
+    PARTS (the estimate, the refutation suite) is cached separately, so
+    the cheap estimate can be served while refutations are still running.
+
+    The data file is stat()ed on every lookup; when it changes the engine
+    is rebuilt, and since the fingerprint changes with it every part is
+    recomputed on its next get(). Concurrent misses wait on one
+    computation instead of each running their own.
+
+    Callers that compute elsewhere (e.g. in a worker process) use
+    current_key() and store() instead of get().
+    """
+
+    def __init__(self, engine_factory: Callable[[], Any], data_path: Optional[str] = None):
+        self.engine_factory = engine_factory
+        self.data_path = data_path
+        self._engine = None
+        self._data_stat = None
+        self._key: Optional[str] = None
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._computed_at: Dict[str, float] = {}
+        self._compute_seconds: Dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        if not self.data_path:
+            return None
+        try:
+            st = os.stat(self.data_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _current_engine(self):
+        stat = self._stat()
+        if self._engine is None or stat != self._data_stat:
+            if self._engine is not None:
+                logger.info(f"{self.data_path} changed, reloading causal engine")
+            self._engine = self.engine_factory()
+            self._data_stat = stat
+        return self._engine
+
+    def _set(self, key: str, part: str, results: Dict[str, Any], compute_seconds: Optional[float]) -> None:
+        if key != self._key:
+            # New data/configuration: every other part is stale
+            self._key = key
+            self._results, self._computed_at, self._compute_seconds = {}, {}, {}
+        self._results[part] = results
+        self._computed_at[part] = time.time()
+        self._compute_seconds[part] = compute_seconds
+
+    def cached(self, part: str = "inference") -> Optional[Dict[str, Any]]:
+        """Results for the current data if already computed, else None. Never blocks on inference."""
+        if self._stat() != self._data_stat:
+            return None
+        return self._results.get(part)
+
+    def engine(self):
+        """The engine for the current data (reloads it if the data changed)."""
+        with self._lock:
+            return self._current_engine()
+
+    def current_key(self) -> str:
+        """Fingerprint of the current data/configuration (reloads the data if it changed)."""
+        with self._lock:
+            return self._current_engine().fingerprint()
+
+    def store(self, key: str, results: Dict[str, Any], compute_seconds: Optional[float] = None,
+              part: str = "inference") -> None:
+        """Caches results computed elsewhere, unless the data moved on or was invalidated meanwhile."""
+        with self._lock:
+            if self._engine is None or self._engine.fingerprint() != key:
+                return
+            self._set(key, part, results, compute_seconds)
+
+    def get(self, part: str = "inference") -> Dict[str, Any]:
+        """Results for the current data, computing them in-process first on a miss."""
+        results = self.cached(part)
+        if results is not None:
+            return results
+        with self._lock:
+            engine = self._current_engine()
+            key = engine.fingerprint()
+            if key != self._key or part not in self._results:
+                logger.info(f"Causal results cache miss ({part}, {key[:12]}), computing...")
+                start = time.perf_counter()
+                results = getattr(engine, PARTS[part])()
+                self._set(key, part, results, time.perf_counter() - start)
+            return self._results[part]
+
+    def invalidate(self) -> None:
+        """Drops cached results and the loaded dataset; the next get() recomputes."""
+        with self._lock:
+            self._engine = None
+            self._data_stat = None
+            self._key = None
+            self._results, self._computed_at, self._compute_seconds = {}, {}, {}
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "cached": self.cached() is not None,
+            "key": self._key,
+            "parts": {
+                part: {
+                    "cached": self.cached(part) is not None,
+                    "computed_at": self._computed_at.get(part),
+                    "compute_seconds": round(self._compute_seconds[part], 3)
+                                       if self._compute_seconds.get(part) is not None else None
+                }
+                for part in PARTS
+            },
+            "data_path": self.data_path
+        }
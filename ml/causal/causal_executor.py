@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class ExecutorBusy(RuntimeError):
+    """Raised when too many distinct computations are already queued."""
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound causal work in a process pool so the event loop stays
+    free. At most max_workers computations run at once and at most
+    max_queued distinct ones may be in flight; beyond that callers get
+    ExecutorBusy. Calls with the same key while one is in flight share
+    its result instead of starting another.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 8):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def run(self, key: Hashable, fn: Callable[..., Any], *args: Any) -> Any:
+        """Result of fn(*args) in a worker process, coalesced on key."""
+        future = self._inflight.get(key)
+        if future is None:
+            if len(self._inflight) >= self.max_queued:
+                raise ExecutorBusy(f"{len(self._inflight)} computations already in flight")
+            loop = asyncio.get_running_loop()
+            future = asyncio.ensure_future(loop.run_in_executor(self._get_pool(), fn, *args))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+        else:
+            logger.info(f"Coalescing request onto in-flight computation {key}")
+        # A disconnecting client must not cancel work others are waiting on
+        return await asyncio.shield(future)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    key: Hashable
+    status: str = "pending"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        body = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at
+        }
+        if self.status == "done":
+            body["result"] = self.result
+        elif self.status == "failed":
+            body["error"] = self.error
+        return body
+
+class JobStore:
+    """
+    Submit/poll bookkeeping for long computations. A job goes from
+    "pending" to "running" once its task starts, then to "done" or
+    "failed". A submission whose key matches an unfinished job returns
+    that job. Only the latest max_jobs jobs
+    are remembered.
+    """
+
+    def __init__(self, max_jobs: int = 256):
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._pending: Dict[Hashable, Job] = {}
+        self._ids = itertools.count(1)
+        self._tasks = set()
+
+    def submit(self, kind: str, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Job:
+        job = self._pending.get(key)
+        if job is not None:
+            return job
+
+        job = Job(id=f"{kind}-{next(self._ids)}", kind=kind, key=key)
+        self._jobs[job.id] = job
+        self._pending[key] = job
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+
+        async def runner():
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                job.result = await work()
+                job.status = "done"
+            except Exception as e:
+                logger.exception(f"Job {job.id} failed")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                self._pending.pop(key, None)
+
+        task = asyncio.create_task(runner())
+        # Keep a reference so the task is not garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
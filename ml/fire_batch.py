@@ -0,0 +1,164 @@
+# FILE: DELHI/ml/fire_batch.py
+import datetime
+from dataclasses import dataclass
+
+import numpy as np
+
+# VIIRS and the simulator report confidence as a class, MODIS as 0-100
+CONFIDENCE_CLASSES = {
+    "l": 30, "low": 30,
+    "n": 70, "nominal": 70,
+    "h": 90, "high": 90,
+}
+
+COLUMN_DTYPES = {
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "brightness": np.float32,   # Kelvin
+    "frp": np.float32,          # Fire Radiative Power, MW
+    "confidence": np.uint8,     # 0-100
+    "acquired_at": np.int64,    # UTC epoch seconds, 0 if unknown
+}
+
+# Labels for the class values above, used when writing dicts back out
+CONFIDENCE_LABELS = {30: "low", 70: "nominal", 90: "high"}
+
+def parse_confidence(value):
+    """Maps a class label or a numeric string/number onto 0-100."""
+    if isinstance(value, str):
+        label = value.strip().lower()
+        if label in CONFIDENCE_CLASSES:
+            return CONFIDENCE_CLASSES[label]
+        value = float(label)
+    return min(max(int(value), 0), 100)
+
+@dataclass
+class FireBatch:
+    """
+    Struct-of-arrays container for fire hotspots: one NumPy column per
+    field (about 33 bytes per hotspot) instead of one dict per fire.
+    Ingest, simulation, clustering and impact scoring all work on the
+    columns directly; to_records() is only for the JSON boundary.
+    """
+    latitude: np.ndarray
+    longitude: np.ndarray
+    brightness: np.ndarray
+    frp: np.ndarray
+    confidence: np.ndarray
+    acquired_at: np.ndarray
+    source: str = "NASA-MODIS"
+
+    def __post_init__(self):
+        for name, dtype in COLUMN_DTYPES.items():
+            setattr(self, name, np.asarray(getattr(self, name), dtype=dtype))
+        lengths = {len(getattr(self, name)) for name in COLUMN_DTYPES}
+        if len(lengths) > 1:
+            raise ValueError(f"FireBatch columns have mismatched lengths: {sorted(lengths)}")
+
+    def __len__(self):
+        return len(self.latitude)
+
+    def __getitem__(self, index):
+        """Row subset by index array, slice or boolean mask."""
+        return FireBatch(**{name: getattr(self, name)[index] for name in COLUMN_DTYPES}, source=self.source)
+
+    @property
+    def intensity(self):
+        return self.brightness.astype(np.float64) / 400
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in COLUMN_DTYPES)
+
+    def keys(self):
+        """Detection identity: position to 1e-4 degrees plus acquisition time."""
+        lat = np.round(self.latitude * 1e4).astype(np.int64).tolist()
+        lon = np.round(self.longitude * 1e4).astype(np.int64).tolist()
+        return list(zip(lat, lon, self.acquired_at.tolist()))
+
+    @classmethod
+    def empty(cls, source="NASA-MODIS"):
+        return cls(**{name: np.empty(0, dtype=dtype) for name, dtype in COLUMN_DTYPES.items()}, source=source)
+
+    @classmethod
+    def concat(cls, batches):
+        batches = list(batches)
+        if not batches:
+            return cls.empty()
+        return cls(**{name: np.concatenate([getattr(b, name) for b in batches]) for name in COLUMN_DTYPES},
+                   source=batches[0].source)
+
+    @classmethod
+    def from_records(cls, records, source="NASA-MODIS"):
+        """
+        Builds a batch from per-fire dicts in any of the shapes the pipeline
+        has used: latitude/longitude or position, confidence as class or
+        number. Missing frp/confidence fall back to the cluster defaults.
+        """
+        lat, lon, bright, frp, conf = [], [], [], [], []
+        for r in records:
+            if 'position' in r:
+                lat.append(r['position'][0])
+                lon.append(r['position'][1])
+            else:
+                lat.append(r['latitude'])
+                lon.append(r['longitude'])
+            bright.append(r.get('brightness', r.get('intensity', 0) * 400))
+            frp.append(r.get('frp', 10))
+            conf.append(parse_confidence(r.get('confidence', 50)))
+        return cls(lat, lon, bright, frp, conf, np.zeros(len(lat), dtype=np.int64), source=source)
+
+    def save(self, path):
+        """Writes the columns to a .npz file."""
+        np.savez(path, source=np.array(self.source), **{name: getattr(self, name) for name in COLUMN_DTYPES})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in COLUMN_DTYPES}, source=str(data["source"]))
+
+    def to_records(self, **extra_columns):
+        """
+        JSON boundary: one dict per fire in the shape the frontend reads.
+        extra_columns are per-fire arrays added under their keyword name.
+        """
+        lats = self.latitude.tolist()
+        lons = self.longitude.tolist()
+        intensity = np.round(self.intensity, 4).tolist()
+        frp = np.round(self.frp.astype(np.float64), 2).tolist()
+        conf = self.confidence.tolist()
+        extras = {name: np.asarray(values).tolist() for name, values in extra_columns.items()}
+        records = []
+        for i in range(len(lats)):
+            record = {
+                "id": i,
+                "position": [lats[i], lons[i]],
+                "intensity": intensity[i],
+                "frp": frp[i],
+                "confidence": conf[i]
+            }
+            for name, values in extras.items():
+                record[name] = values[i]
+            records.append(record)
+        return records
+
+    def to_detection_records(self):
+        """
+        One dict per fire in the detector's pre-FireBatch shape: latitude,
+        longitude, brightness, frp, acquisition_time (ISO 8601, UTC),
+        confidence as a class label where it is one, and satellite.
+        """
+        stamps = [datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat()
+                  for t in self.acquired_at.tolist()]
+        rows = zip(self.latitude.tolist(), self.longitude.tolist(),
+                   np.round(self.brightness.astype(np.float64), 1).tolist(),
+                   np.round(self.frp.astype(np.float64), 2).tolist(), stamps, self.confidence.tolist())
+        return [{
+            "latitude": lat,
+            "longitude": lon,
+            "brightness": bright,
+            "frp": frp,
+            "acquisition_time": stamp,
+            "confidence": CONFIDENCE_LABELS.get(conf, conf),
+            "satellite": self.source
+        } for lat, lon, bright, frp, stamp, conf in rows]
@@ -1,92 +1,167 @@
 # FILE: DELHI/ml/fire_clustering.py
 import json
-import math
 import os
 
-def haversine(coord1, coord2):
+import numpy as np
+
+import instrumentation
+from fire_batch import FireBatch
+from geodesy import haversine, pairs_within_radius
+from ranking import top_k_indices
+
+CLUSTER_RANK_KEYS = ("total_frp", "fire_count", "avg_confidence")
+
+def connected_labels(n, i, j):
     """
-    Calculate the great circle distance between two points 
-    on the earth (specified in decimal degrees)
+    Labels the connected components of an n-node graph given as edge arrays
+    (i, j). Every node ends up labelled with the lowest node index in its
+    component. Hook-and-jump label propagation, no Python loop over edges.
     """
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    
-    # Convert decimal degrees to radians 
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-
-    # Haversine formula 
-    dlat = lat2 - lat1 
-    dlon = lon2 - lon1 
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a)) 
-    r = 6371 # Radius of earth in kilometers
-    return c * r
-
-def cluster_fires(fires, radius_km=20):
+    labels = np.arange(n)
+    while len(i):
+        li, lj = labels[i], labels[j]
+        pending = li != lj
+        if not pending.any():
+            break
+        i, j, li, lj = i[pending], j[pending], li[pending], lj[pending]
+        low = np.minimum(li, lj)
+        # Hook both roots onto the smaller label, then compress paths
+        np.minimum.at(labels, li, low)
+        np.minimum.at(labels, lj, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
+
+def cluster_labels(lats, lons, radius_km=20):
     """
-    Groups fires within radius_km into clusters.
-    Manual implementation of proximity clustering.
+    Component label per fire where two fires are linked when they lie within
+    radius_km of each other. Labels are 0..k-1, numbered in order of each
+    component's first fire.
     """
-    if not fires:
-        return []
+    i, j, _ = pairs_within_radius(lats, lons, radius_km)
+    roots = connected_labels(len(lats), i, j)
+    _, labels = np.unique(roots, return_inverse=True)
+    return labels
+
+def as_fire_batch(fires):
+    """Accepts a FireBatch or a list of per-fire dicts."""
+    return fires if isinstance(fires, FireBatch) else FireBatch.from_records(fires)
 
+def label_components(fires, radius_km=20):
+    """
+    Groups fires into connected components (see cluster_labels).
+    Returns a list of index lists, ordered by each component's first fire.
+    """
+    batch = as_fire_batch(fires)
+    labels = cluster_labels(batch.latitude, batch.longitude, radius_km)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.cumsum(np.bincount(labels))[:-1]
+    return [members.tolist() for members in np.split(order, bounds)]
+
+def label_components_naive(fires, radius_km=20):
+    """
+    Original O(n^2) proximity scan, kept as the reference implementation
+    for benchmarks and equivalence checks against label_components.
+    """
     visited = [False] * len(fires)
-    clusters = []
+    components = []
 
     for i in range(len(fires)):
         if visited[i]:
             continue
         
         # Start a new cluster
-        current_cluster = [fires[i]]
+        current_cluster = [i]
         visited[i] = True
         
         # Find all reachable points for this cluster
         j = 0
         while j < len(current_cluster):
-            point_a = current_cluster[j]
+            point_a = fires[current_cluster[j]]
             for k in range(len(fires)):
                 if not visited[k]:
                     point_b = fires[k]
                     # Check distance from the latest point added to cluster
                     dist = haversine(point_a['position'], point_b['position'])
                     if dist <= radius_km:
-                        current_cluster.append(point_b)
+                        current_cluster.append(k)
                         visited[k] = True
             j += 1
-        clusters.append(current_cluster)
+        components.append(sorted(current_cluster))
+    return components
 
-    # Process clusters into metrics
-    processed_clusters = []
-    for idx, cluster in enumerate(clusters):
-        total_frp = sum(f.get('frp', 10) for f in cluster)
-        avg_conf = sum(f.get('confidence', 50) for f in cluster) / len(cluster)
-        
-        # Calculate centroid
-        avg_lat = sum(f['position'][0] for f in cluster) / len(cluster)
-        avg_lon = sum(f['position'][1] for f in cluster) / len(cluster)
-        
-        # Assign severity
-        severity = "Low"
-        if total_frp > 500: severity = "Critical"
-        elif total_frp > 200: severity = "High"
-        elif total_frp > 50: severity = "Moderate"
-
-        processed_clusters.append({
-            "id": idx,
-            "center": [round(avg_lat, 4), round(avg_lon, 4)],
-            "fire_count": len(cluster),
-            "total_frp": round(total_frp, 1),
-            "avg_confidence": round(avg_conf, 1),
-            "severity": severity,
-            "radius_km": radius_km
-        })
-
-    # Sort by severity (total FRP) and take top 5
-    processed_clusters.sort(key=lambda x: x['total_frp'], reverse=True)
-    return processed_clusters[:5]
-
-def run_clustering(fires=None):
+def severity_for(total_frp):
+    # Assign severity
+    if total_frp > 500: return "Critical"
+    if total_frp > 200: return "High"
+    if total_frp > 50: return "Moderate"
+    return "Low"
+
+def summarise_cluster(cluster_id, fire_count, sum_frp, sum_conf, sum_lat, sum_lon, radius_km):
+    """Turns per-cluster running sums into the cluster record the frontend reads."""
+    return {
+        "id": cluster_id,
+        "center": [round(sum_lat / fire_count, 4), round(sum_lon / fire_count, 4)],
+        "fire_count": fire_count,
+        "total_frp": round(sum_frp, 1),
+        "avg_confidence": round(sum_conf / fire_count, 1),
+        "severity": severity_for(sum_frp),
+        "radius_km": radius_km
+    }
+
+def _rank_values(rank_by, count, sum_frp, sum_conf):
+    # Rank on the rounded values the records report, like the old sort did
+    if rank_by == "total_frp":
+        return np.round(sum_frp, 1)
+    if rank_by == "fire_count":
+        return count
+    if rank_by == "avg_confidence":
+        return np.round(sum_conf / count, 1)
+    raise ValueError(f"Unknown cluster rank key '{rank_by}' (expected one of {', '.join(CLUSTER_RANK_KEYS)})")
+
+def top_clusters(ids, count, sum_frp, sum_conf, sum_lat, sum_lon, radius_km, top_k=5, rank_by="total_frp"):
+    """
+    Selects the top_k clusters by rank_by from per-cluster sum arrays and
+    builds records only for those. top_k=None returns every cluster.
+    """
+    keep = top_k_indices(_rank_values(rank_by, count, sum_frp, sum_conf), top_k)
+    return [
+        summarise_cluster(int(ids[c]), int(count[c]), float(sum_frp[c]), float(sum_conf[c]),
+                          float(sum_lat[c]), float(sum_lon[c]), radius_km)
+        for c in keep
+    ]
+
+def cluster_fires(fires, radius_km=20, top_k=5, rank_by="total_frp"):
+    """
+    Groups fires within radius_km into clusters.
+    Takes a FireBatch (or per-fire dicts, converted on entry).
+    Grid-indexed proximity clustering (see cluster_labels), with cluster
+    metrics aggregated in one bincount pass per column. Returns the top_k
+    clusters ranked by rank_by (one of CLUSTER_RANK_KEYS).
+    """
+    batch = as_fire_batch(fires)
+    if not len(batch):
+        return []
+
+    frp = batch.frp.astype(np.float64)
+    conf = batch.confidence.astype(np.float64)
+
+    with instrumentation.span("clustering.labels"):
+        labels = cluster_labels(batch.latitude, batch.longitude, radius_km)
+    count = np.bincount(labels)
+    instrumentation.count("clustering.fires", len(batch))
+    instrumentation.count("clustering.clusters_produced", len(count))
+    return top_clusters(
+        np.arange(len(count)), count,
+        np.bincount(labels, weights=frp), np.bincount(labels, weights=conf),
+        np.bincount(labels, weights=batch.latitude), np.bincount(labels, weights=batch.longitude),
+        radius_km, top_k=top_k, rank_by=rank_by
+    )
+
+def run_clustering(fires=None, top_k=5, rank_by="total_frp"):
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_path = os.path.join(script_dir, '../src/data/live_fires.json')
     
@@ -98,7 +173,8 @@ def run_clustering(fires=None):
             fires = json.load(f)
 
     print(f"🔄 Grouping {len(fires)} hotspots into severity zones...")
-    clusters = cluster_fires(fires)
+    with instrumentation.span("clustering.total"):
+        clusters = cluster_fires(fires, top_k=top_k, rank_by=rank_by)
     return clusters
 
 if __name__ == "__main__":
@@ -106,6 +182,5 @@ if __name__ == "__main__":
     print(f"✅ Success: Generated {len(clusters)} high-intensity clusters.")
     for c in clusters:
         print(f"📍 Cluster {c['id']}: {c['severity']} Zone | FRP: {c['total_frp']} MW | Count: {c['fire_count']}")
-
-if __name__ == "__main__":
-    run_clustering()
+    # DELHI_METRICS=1 writes a run report to output/reports/fire_clustering.json
+    instrumentation.write_report("fire_clustering")
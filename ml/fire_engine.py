@@ -3,6 +3,16 @@ import random
 import json
 import datetime
 
+import numpy as np
+
+from fire_batch import FireBatch, parse_confidence
+from geodesy import EARTH_RADIUS_KM
+
+# MODIS South Asia 24h feed footprint (lat_min, lat_max, lon_min, lon_max)
+SOUTH_ASIA_BBOX = (6.0, 36.0, 66.0, 98.0)
+
+FIRMS_CSV_HEADER = "latitude,longitude,brightness,acq_date,acq_time,satellite,confidence,frp"
+
 class SatelliteFireDetector:
     def __init__(self):
         # Bounding Box for Punjab/Haryana (Stubble Burning Zone)
@@ -12,34 +22,86 @@ class SatelliteFireDetector:
     def detect_active_fires(self):
         """
         Simulates NASA VIIRS/MODIS satellite data.
-        Returns a list of active fire hotspots with intensity.
+        Returns a FireBatch of active fire hotspots with intensity; the
+        acquisition time is in acquired_at and the satellite in source.
+        Use detect_active_fire_records() for the older list of dicts.
         """
         # Generate 40-60 active fires (typical for winter season)
         fire_count = random.randint(40, 60)
-        fires = []
+        lats, lons, brightness, frps, confidence = [], [], [], [], []
         
         for _ in range(fire_count):
             # Generate coordinate within the "Burning Belt"
-            lat = random.uniform(self.LAT_RANGE[0], self.LAT_RANGE[1])
-            lon = random.uniform(self.LON_RANGE[0], self.LON_RANGE[1])
+            lats.append(round(random.uniform(self.LAT_RANGE[0], self.LAT_RANGE[1]), 4))
+            lons.append(round(random.uniform(self.LON_RANGE[0], self.LON_RANGE[1]), 4))
+            
+            brightness.append(round(random.uniform(300, 380), 1)) # Kelvin
             
             # Fire Radiative Power (MW) - Intensity
-            frp = random.uniform(10.5, 150.0) 
+            frps.append(round(random.uniform(10.5, 150.0), 1))
             
             # Confidence Level
-            confidence = random.choice(['nominal', 'high'])
-            
-            fires.append({
-                "latitude": round(lat, 4),
-                "longitude": round(lon, 4),
-                "brightness": round(random.uniform(300, 380), 1), # Kelvin
-                "frp": round(frp, 1), # Fire Radiative Power
-                "acquisition_time": datetime.datetime.now().isoformat(),
-                "confidence": confidence,
-                "satellite": "NASA-VIIRS"
-            })
-            
-        return fires
+            confidence.append(parse_confidence(random.choice(['nominal', 'high'])))
+        
+        acquired_at = np.full(fire_count, int(datetime.datetime.now().timestamp()), dtype=np.int64)
+        return FireBatch(lats, lons, brightness, frps, confidence, acquired_at, source="NASA-VIIRS")
+
+    def detect_active_fire_records(self):
+        """
+        detect_active_fires() as a list of per-fire dicts with
+        acquisition_time and satellite, the shape it returned before
+        FireBatch. For callers outside ml/ that still read dicts.
+        """
+        return self.detect_active_fires().to_detection_records()
+
+    def simulate_bulk_fires(self, n_fires, seed=None, bbox=SOUTH_ASIA_BBOX, hotspots=None,
+                            clustered_fraction=0.7, spread_km=15.0, frp_median=20.0, frp_sigma=1.0,
+                            time_span_hours=24.0, end_time=None):
+        """
+        Seeded, vectorized generator for load tests: n_fires synthetic
+        detections as a FireBatch, produced without a per-fire Python loop.
+
+        - hotspots burning districts (default one per 200 fires) get
+          clustered_fraction of the detections, scattered around each
+          centre with a spread_km standard deviation; district sizes are
+          uneven (Dirichlet weights). The rest fall uniformly over bbox.
+        - FRP is log-normal with the given median (MW) and sigma; brightness
+          rises with FRP.
+        - Acquisition times are uniform over the time_span_hours before
+          end_time (epoch seconds, default now), at minute resolution
+          like FIRMS acq_time.
+        """
+        rng = np.random.default_rng(seed)
+        lat_min, lat_max, lon_min, lon_max = bbox
+        hotspots = hotspots or max(1, n_fires // 200)
+
+        centre_lat = rng.uniform(lat_min, lat_max, hotspots)
+        centre_lon = rng.uniform(lon_min, lon_max, hotspots)
+        weights = rng.dirichlet(np.full(hotspots, 0.5))
+
+        clustered = rng.random(n_fires) < clustered_fraction
+        n_clustered = int(clustered.sum())
+        owner = rng.choice(hotspots, size=n_clustered, p=weights)
+
+        spread_deg = np.degrees(spread_km / EARTH_RADIUS_KM)
+        lat = rng.uniform(lat_min, lat_max, n_fires)
+        lon = rng.uniform(lon_min, lon_max, n_fires)
+        lat[clustered] = centre_lat[owner] + rng.normal(0, spread_deg, n_clustered)
+        lon[clustered] = centre_lon[owner] + rng.normal(0, 1, n_clustered) * spread_deg / np.cos(np.radians(centre_lat[owner]))
+        np.clip(lat, lat_min, lat_max, out=lat)
+        np.clip(lon, lon_min, lon_max, out=lon)
+
+        frp = rng.lognormal(np.log(frp_median), frp_sigma, n_fires)
+        brightness = np.clip(300 + 12 * np.log1p(frp) + rng.normal(0, 5, n_fires), 290, 510)
+        confidence = np.clip(rng.normal(80, 12, n_fires), 0, 100)
+
+        end_time = int(datetime.datetime.now().timestamp()) if end_time is None else int(end_time)
+        span_minutes = max(1, int(time_span_hours * 60))
+        acquired_at = end_time - rng.integers(0, span_minutes, n_fires) * 60
+        acquired_at -= acquired_at % 60
+
+        return FireBatch(np.round(lat, 4), np.round(lon, 4), np.round(brightness, 1), np.round(frp, 2),
+                         confidence, acquired_at, source="SIMULATED")
 
     def get_smoke_forecast(self, fires):
         """
@@ -48,18 +110,14 @@ class SatelliteFireDetector:
         # Delhi Coordinates
         DELHI_LAT, DELHI_LON = 28.61, 77.20
         
-        drift_warnings = []
-        total_impact = 0
+        # Simple distance weight
+        dist_lat = np.abs(fires.latitude - DELHI_LAT)
+        dist_lon = np.abs(fires.longitude - DELHI_LON)
         
-        for fire in fires:
-            # Simple distance weight
-            dist_lat = abs(fire['latitude'] - DELHI_LAT)
-            dist_lon = abs(fire['longitude'] - DELHI_LON)
-            
-            # If fire is Northwest of Delhi (Winter pattern)
-            if fire['latitude'] > DELHI_LAT and fire['longitude'] < DELHI_LON:
-                impact = (fire['frp'] / (dist_lat + dist_lon)) * 0.5
-                total_impact += impact
+        # Only fires Northwest of Delhi (Winter pattern) contribute
+        upwind = (fires.latitude > DELHI_LAT) & (fires.longitude < DELHI_LON)
+        impact = (fires.frp[upwind] / (dist_lat[upwind] + dist_lon[upwind])) * 0.5
+        total_impact = float(impact.sum())
 
         return {
             "total_fires": len(fires),
@@ -67,7 +125,47 @@ class SatelliteFireDetector:
             "estimated_pm25_contribution": round(total_impact, 2)
         }
 
+def write_firms_csv(fires, path, chunk_size=200_000):
+    """
+    Writes a FireBatch as a FIRMS-style CSV that read_firms_csv can ingest,
+    in chunks so millions of rows never become one giant string.
+    """
+    with open(path, 'w') as f:
+        f.write(FIRMS_CSV_HEADER + "\n")
+        for start in range(0, len(fires), chunk_size):
+            chunk = fires[start:start + chunk_size]
+            stamps = chunk.acquired_at.astype("datetime64[s]")
+            dates = np.datetime_as_string(stamps, unit="D").tolist()
+            seconds = chunk.acquired_at % 86400
+            times = (seconds // 3600 * 100 + seconds % 3600 // 60).tolist()
+            rows = zip(chunk.latitude.tolist(), chunk.longitude.tolist(),
+                       np.round(chunk.brightness.astype(np.float64), 1).tolist(), dates, times,
+                       chunk.confidence.tolist(), np.round(chunk.frp.astype(np.float64), 2).tolist())
+            f.write("".join(f"{la},{lo},{b},{d},{t:04d},S,{c},{p}\n" for la, lo, b, d, t, c, p in rows))
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Satellite fire simulator")
+    parser.add_argument("--bulk", type=int, help="Generate this many synthetic hotspots instead of a 40-60 fire snapshot")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--hotspots", type=int, default=None)
+    parser.add_argument("--frp-median", type=float, default=20.0)
+    parser.add_argument("--frp-sigma", type=float, default=1.0)
+    parser.add_argument("--hours", type=float, default=24.0)
+    parser.add_argument("--out", help="Output file: .npz for FireBatch columns, .csv for FIRMS format")
+    args = parser.parse_args()
+
     detector = SatelliteFireDetector()
-    fires = detector.detect_active_fires()
-    print(json.dumps(detector.get_smoke_forecast(fires), indent=2))
\ No newline at end of file
+    if args.bulk:
+        fires = detector.simulate_bulk_fires(args.bulk, seed=args.seed, hotspots=args.hotspots,
+                                             frp_median=args.frp_median, frp_sigma=args.frp_sigma,
+                                             time_span_hours=args.hours)
+        if args.out and args.out.endswith(".csv"):
+            write_firms_csv(fires, args.out)
+        elif args.out:
+            fires.save(args.out)
+        print(f"✅ Simulated {len(fires)} hotspots ({fires.nbytes / 1e6:.1f} MB){' -> ' + args.out if args.out else ''}")
+    else:
+        fires = detector.detect_active_fires()
+        print(json.dumps(detector.get_smoke_forecast(fires), indent=2))
@@ -0,0 +1,151 @@
+# FILE: DELHI/ml/firms_cache.py
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import NamedTuple, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(SCRIPT_DIR, "cache", "firms")
+
+class FeedFetch(NamedTuple):
+    status: str              # "fresh", "not_modified", "unchanged" or "updated"
+    path: Optional[str]      # Snapshot holding the current feed body
+    sha256: Optional[str]    # Content hash of that snapshot
+    fetched_at: Optional[str]
+
+    @property
+    def changed(self):
+        return self.status == "updated"
+
+class FirmsFeedCache:
+    """
+    On-disk cache for a FIRMS CSV feed.
+
+    - Polls inside ttl_seconds of the last check never touch the network.
+    - Other polls send If-None-Match / If-Modified-Since, so an unchanged
+      feed costs a single 304.
+    - Full downloads are hashed while streaming to disk; a body identical
+      to the last snapshot is reported as "unchanged" and discarded.
+    - New bodies become versioned snapshots, keeping the newest
+      keep_snapshots files.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=300, keep_snapshots=5):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.keep_snapshots = keep_snapshots
+        self.state_path = os.path.join(cache_dir, "state.json")
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self, state):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def _result(self, status, entry):
+        path = entry.get("snapshot")
+        if path and not os.path.exists(path):
+            path = None
+        return FeedFetch(status, path, entry.get("sha256"), entry.get("fetched_at"))
+
+    def snapshots(self):
+        """Snapshot paths, oldest first."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        names = sorted(n for n in os.listdir(self.cache_dir) if n.startswith("firms-") and n.endswith(".csv"))
+        return [os.path.join(self.cache_dir, n) for n in names]
+
+    def latest(self, url):
+        """Last snapshot recorded for url, without any network access."""
+        return self._result("fresh", self._load_state().get(url, {}))
+
+    def fetch(self, url, timeout=10, force=False):
+        state = self._load_state()
+        entry = state.get(url, {})
+        now = time.time()
+
+        has_snapshot = entry.get("snapshot") and os.path.exists(entry["snapshot"])
+        if not force and has_snapshot and now - entry.get("checked_at", 0) < self.ttl_seconds:
+            return self._result("fresh", entry)
+
+        headers = {}
+        if has_snapshot and not force:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._get(url, headers, timeout)
+        if response is None and not os.path.exists(entry.get("snapshot") or ""):
+            # 304 but nothing on disk to reuse (e.g. removed meanwhile): ask again unconditionally
+            response = self._get(url, {}, timeout)
+            if response is None:
+                raise RuntimeError(f"{url} answered 304 to an unconditional request")
+            has_snapshot = False
+        if response is None:
+            entry["checked_at"] = now
+            state[url] = entry
+            self._save_state(state)
+            return self._result("not_modified", entry)
+        tmp_path, sha, etag, last_modified = response
+        entry.update(etag=etag, last_modified=last_modified, checked_at=now)
+
+        if has_snapshot and sha == entry.get("sha256"):
+            os.remove(tmp_path)
+            state[url] = entry
+            self._save_state(state)
+            return self._result("unchanged", entry)
+
+        stamp = datetime.datetime.now(datetime.timezone.utc)
+        snapshot = os.path.join(self.cache_dir, f"firms-{stamp.strftime('%Y%m%dT%H%M%S%f')}-{sha[:12]}.csv")
+        os.replace(tmp_path, snapshot)
+        entry.update(snapshot=snapshot, sha256=sha, fetched_at=stamp.isoformat())
+        state[url] = entry
+        self._save_state(state)
+        self._rotate(keep={s["snapshot"] for s in state.values() if s.get("snapshot")})
+        return self._result("updated", entry)
+
+    def _get(self, url, headers, timeout):
+        """
+        GETs url into a private temp file in cache_dir, hashing while it
+        streams. Returns (tmp_path, sha256, etag, last_modified), or None
+        on 304 Not Modified.
+        """
+        import requests
+
+        with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Unique per fetch, so concurrent pollers never share a partial download
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix="download-", suffix=".tmp")
+            digest = hashlib.sha256()
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        digest.update(chunk)
+                        f.write(chunk)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+            return tmp_path, digest.hexdigest(), response.headers.get("ETag"), response.headers.get("Last-Modified")
+
+    def _rotate(self, keep):
+        stale = self.snapshots()[:-self.keep_snapshots] if self.keep_snapshots else self.snapshots()
+        for path in stale:
+            # Never delete a snapshot some URL still points at
+            if path not in keep:
+                os.remove(path)
@@ -0,0 +1,118 @@
+# FILE: DELHI/ml/firms_ingest.py
+import array
+import csv
+import datetime
+
+import numpy as np
+
+import instrumentation
+from fire_batch import FireBatch, parse_confidence
+
+# FILTER: Punjab & Haryana Region (lat_min, lat_max, lon_min, lon_max)
+PUNJAB_HARYANA_BBOX = (28.0, 32.5, 73.0, 78.0)
+MIN_CONFIDENCE = 70  # Detections must be strictly above this
+
+# MODIS and VIIRS feeds name a few columns differently
+COLUMN_ALIASES = {
+    "latitude": ("latitude",),
+    "longitude": ("longitude",),
+    "brightness": ("brightness", "bright_ti4"),
+    "frp": ("frp",),
+    "confidence": ("confidence",),
+}
+# Used for acquired_at when present; missing columns leave it at 0
+OPTIONAL_COLUMNS = ("acq_date", "acq_time")
+
+def _column_positions(header):
+    header = [h.strip().lower() for h in header]
+    positions = {}
+    for name, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in header:
+                positions[name] = header.index(alias)
+                break
+        else:
+            raise ValueError(f"FIRMS CSV is missing a '{name}' column (header: {','.join(header)})")
+    for name in OPTIONAL_COLUMNS:
+        if name in header:
+            positions[name] = header.index(name)
+    return positions
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+def _acquired_at(date_str, time_str, day_cache):
+    # A 24h feed only spans a couple of dates, so parse each one once
+    day = day_cache.get(date_str)
+    if day is None:
+        day = (datetime.date.fromisoformat(date_str.strip()) - _EPOCH).days * 86400
+        day_cache[date_str] = day
+    hhmm = int(time_str.replace(":", "").strip() or 0)
+    return day + (hhmm // 100) * 3600 + (hhmm % 100) * 60
+
+def read_firms_csv(source, bbox=PUNJAB_HARYANA_BBOX, min_confidence=MIN_CONFIDENCE, source_name="NASA-MODIS"):
+    """
+    Parses a FIRMS active-fire CSV one row at a time, keeping only rows
+    inside bbox with confidence > min_confidence. Columns are located by
+    header name. source may be a file path or any iterable of text lines
+    (an open file, a list of lines). Pass bbox=None to keep every
+    region. Returns a FireBatch.
+    """
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8") as f:
+            return read_firms_csv(f, bbox, min_confidence, source_name)
+
+    rows = csv.reader(source)
+    header = next(rows, None)
+    if header is None:
+        raise ValueError("FIRMS CSV is empty")
+    pos = _column_positions(header)
+    i_lat, i_lon, i_bright, i_frp, i_conf = (
+        pos["latitude"], pos["longitude"], pos["brightness"], pos["frp"], pos["confidence"]
+    )
+    i_date, i_time = pos.get("acq_date"), pos.get("acq_time")
+    has_time = i_date is not None and i_time is not None
+    width = max(pos.values()) + 1
+    day_cache = {}
+    lat_min, lat_max, lon_min, lon_max = bbox if bbox else (-90.0, 90.0, -180.0, 180.0)
+
+    lats, lons = array.array("d"), array.array("d")
+    brights, frps = array.array("f"), array.array("f")
+    confs = array.array("B")
+    acquired = array.array("q")
+
+    for row in rows:
+        if len(row) < width:
+            continue
+        try:
+            lat = float(row[i_lat])
+            lon = float(row[i_lon])
+            if not (lat_min <= lat <= lat_max and lon_min <= lon <= lon_max):
+                continue
+            conf = parse_confidence(row[i_conf])
+            if conf <= min_confidence:
+                continue
+            bright = float(row[i_bright])
+            frp = float(row[i_frp])
+            acq = _acquired_at(row[i_date], row[i_time], day_cache) if has_time else 0
+        except ValueError:
+            continue
+        lats.append(lat)
+        lons.append(lon)
+        brights.append(bright)
+        frps.append(frp)
+        confs.append(conf)
+        acquired.append(acq)
+
+    # line_num counts physical lines, header included
+    instrumentation.count("firms.rows_read", rows.line_num - 1)
+    instrumentation.count("firms.fires_kept", len(lats))
+    instrumentation.count("firms.fires_filtered", rows.line_num - 1 - len(lats))
+    return FireBatch(
+        latitude=np.frombuffer(lats, dtype=np.float64),
+        longitude=np.frombuffer(lons, dtype=np.float64),
+        brightness=np.frombuffer(brights, dtype=np.float32),
+        frp=np.frombuffer(frps, dtype=np.float32),
+        confidence=np.frombuffer(confs, dtype=np.uint8),
+        acquired_at=np.frombuffer(acquired, dtype=np.int64),
+        source=source_name,
+    )
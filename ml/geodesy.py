@@ -0,0 +1,75 @@
+# FILE: DELHI/ml/geodesy.py
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371  # Radius of earth in kilometers
+
+def haversine(coord1, coord2):
+    """
+    Calculate the great circle distance between two points
+    on the earth (specified in decimal degrees)
+    """
+    lat1, lon1 = coord1
+    lat2, lon2 = coord2
+
+    # Convert decimal degrees to radians
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+
+    # Haversine formula
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    c = 2 * math.asin(math.sqrt(a))
+    return c * EARTH_RADIUS_KM
+
+def to_radians(lat, lon):
+    """Converts degree arrays to float64 radian arrays, once per batch."""
+    return np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+
+def haversine_rad(lat1, lon1, lat2, lon2):
+    """
+    Broadcasting haversine kernel. All inputs are in radians; the result
+    is in km with the broadcast shape of the inputs.
+    """
+    sin_dlat = np.sin((lat2 - lat1) * 0.5)
+    sin_dlon = np.sin((lon2 - lon1) * 0.5)
+    a = sin_dlat * sin_dlat + np.cos(lat1) * np.cos(lat2) * sin_dlon * sin_dlon
+    # Rounding can push a a hair above 1 for antipodal points
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def haversine_one_to_many(point, lats, lons):
+    """Distances (km) from one (lat, lon) point to arrays of points, in degrees."""
+    lat0, lon0 = to_radians(point[0], point[1])
+    lat, lon = to_radians(lats, lons)
+    return haversine_rad(lat0, lon0, lat, lon)
+
+def haversine_many_to_many(lats1, lons1, lats2, lons2):
+    """Distance matrix (km) of shape (len(lats1), len(lats2)), inputs in degrees."""
+    lat1, lon1 = to_radians(lats1, lons1)
+    lat2, lon2 = to_radians(lats2, lons2)
+    return haversine_rad(lat1[:, None], lon1[:, None], lat2[None, :], lon2[None, :])
+
+def pairs_within_radius(lats, lons, radius_km):
+    """
+    Every unordered pair (i, j), i < j, of points lying within radius_km of
+    each other. Candidates come from a GridIndex so only neighbouring cells
+    are compared. Returns (i, j, dist_km) arrays.
+    """
+    from spatial_index import GridIndex
+
+    lat, lon = to_radians(lats, lons)
+    index = GridIndex(lats, lons, radius_km)
+
+    found_i, found_j, found_d = [], [], []
+    for i, j in index.candidate_pairs():
+        dist = haversine_rad(lat[i], lon[i], lat[j], lon[j])
+        keep = dist <= radius_km
+        found_i.append(i[keep])
+        found_j.append(j[keep])
+        found_d.append(dist[keep])
+
+    if not found_i:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.copy(), np.empty(0, dtype=np.float64)
+    return np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_d)
@@ -0,0 +1,290 @@
+# FILE: DELHI/ml/incremental_clustering.py
+import math
+import pickle
+
+import numpy as np
+
+from fire_clustering import cluster_labels, top_clusters
+from geodesy import EARTH_RADIUS_KM, haversine_rad, to_radians
+
+class IncrementalFireClusterer:
+    """
+    Keeps the connected-component clusters of cluster_fires up to date as
+    detections are inserted and expired, without reclustering everything.
+
+    - A dynamic lat/lon grid (same sizing rule as GridIndex) limits each
+      new detection's neighbour search to the 3x3 cells around it.
+    - Components are tracked as member sets; merging relabels the smaller
+      sets into the surviving cluster, like union-by-size.
+    - Each cluster keeps running sums, so centroid, total_frp and severity
+      update in O(1) per inserted detection.
+    - Expiring detections only re-clusters the clusters they belonged to.
+
+    Cluster ids are stable: merges keep the id of the biggest cluster
+    involved (oldest on ties), and when a cluster splits its largest
+    fragment keeps the id.
+
+    Detections must lie within max_abs_lat, which fixes the grid's
+    longitude step for the lifetime of the clusterer.
+    """
+
+    def __init__(self, radius_km=20, max_abs_lat=60.0):
+        self.radius_km = radius_km
+        self.max_abs_lat = max_abs_lat
+        self.lat_step = math.degrees(radius_km / EARTH_RADIUS_KM)
+        ratio = radius_km / (2 * EARTH_RADIUS_KM * math.cos(math.radians(max_abs_lat)))
+        min_lon_step = 360.0 if ratio >= 1 else math.degrees(2 * math.asin(ratio))
+        self.n_cols = int(360.0 // min_lon_step)
+        if self.n_cols < 3:
+            self.n_cols = 1
+        self.lon_step = 360.0 / self.n_cols
+
+        # Slot-indexed detection columns; cluster == -1 marks a free slot
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        self.frp = np.empty(0)
+        self.confidence = np.empty(0)
+        self.acquired_at = np.empty(0, dtype=np.int64)
+        self.cluster = np.empty(0, dtype=np.int64)
+        self.free_slots = []
+
+        self.slot_of = {}       # detection key -> slot
+        self.key_of = {}        # slot -> detection key
+        self.cells = {}         # (row, col) -> set of slots
+        self.members = {}       # cluster id -> set of slots
+        self.sums = {}          # cluster id -> [sum_frp, sum_conf, sum_lat, sum_lon]
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    # ---------------------------------------------------------------- storage
+
+    def _allocate(self, n):
+        reused = [self.free_slots.pop() for _ in range(min(n, len(self.free_slots)))]
+        start = len(self.cluster)
+        extra = n - len(reused)
+        if extra:
+            grow = lambda arr, fill: np.concatenate([arr, np.full(extra, fill, dtype=arr.dtype)])
+            self.lat = grow(self.lat, np.nan)
+            self.lon = grow(self.lon, np.nan)
+            self.frp = grow(self.frp, 0.0)
+            self.confidence = grow(self.confidence, 0.0)
+            self.acquired_at = grow(self.acquired_at, 0)
+            self.cluster = grow(self.cluster, -1)
+        return np.array(reused + list(range(start, start + extra)), dtype=np.int64)
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.lat_step),
+                math.floor((lon + 180.0) / self.lon_step) % self.n_cols)
+
+    def _neighbour_slots(self, lat, lon):
+        row, col = self._cell(lat, lon)
+        cols = {(col + d) % self.n_cols for d in (-1, 0, 1)}
+        for r in (row - 1, row, row + 1):
+            for c in cols:
+                yield from self.cells.get((r, c), ())
+
+    # --------------------------------------------------------------- clusters
+
+    def _new_cluster(self):
+        cid = self.next_id
+        self.next_id += 1
+        self.members[cid] = set()
+        self.sums[cid] = [0.0, 0.0, 0.0, 0.0]
+        return cid
+
+    def _add_to_cluster(self, cid, slots):
+        slots = np.asarray(slots, dtype=np.int64)
+        self.cluster[slots] = cid
+        self.members[cid].update(slots.tolist())
+        sums = self.sums[cid]
+        sums[0] += float(self.frp[slots].sum())
+        sums[1] += float(self.confidence[slots].sum())
+        sums[2] += float(self.lat[slots].sum())
+        sums[3] += float(self.lon[slots].sum())
+
+    def _merge(self, survivor, others):
+        for cid in others:
+            slots = self.members.pop(cid)
+            sums = self.sums.pop(cid)
+            self.cluster[list(slots)] = survivor
+            self.members[survivor].update(slots)
+            self.sums[survivor] = [a + b for a, b in zip(self.sums[survivor], sums)]
+
+    def _recompute(self, cid):
+        slots = np.fromiter(self.members[cid], dtype=np.int64)
+        self.sums[cid] = [float(self.frp[slots].sum()), float(self.confidence[slots].sum()),
+                          float(self.lat[slots].sum()), float(self.lon[slots].sum())]
+
+    # ---------------------------------------------------------------- updates
+
+    def insert(self, batch, keys=None):
+        """
+        Adds a FireBatch of detections, skipping keys that are already
+        tracked (or repeated within the batch). Returns the number of new
+        detections.
+        """
+        keys = batch.keys() if keys is None else keys
+        lats, lons = batch.latitude, batch.longitude
+        if len(lats) and np.abs(lats).max() > self.max_abs_lat:
+            raise ValueError(f"Detections beyond {self.max_abs_lat} degrees latitude are not supported")
+
+        fresh, seen = [], set()
+        for i, key in enumerate(keys):
+            if key not in self.slot_of and key not in seen:
+                seen.add(key)
+                fresh.append(i)
+        if not fresh:
+            return 0
+        fresh_idx = np.array(fresh, dtype=np.int64)
+        slots = self._allocate(len(fresh))
+
+        self.lat[slots] = lats[fresh_idx]
+        self.lon[slots] = lons[fresh_idx]
+        self.frp[slots] = batch.frp[fresh_idx]
+        self.confidence[slots] = batch.confidence[fresh_idx]
+        self.acquired_at[slots] = batch.acquired_at[fresh_idx]
+        self.cluster[slots] = -1
+
+        slot_list = slots.tolist()
+        for i, slot in zip(fresh, slot_list):
+            self.slot_of[keys[i]] = slot
+            self.key_of[slot] = keys[i]
+            self.cells.setdefault(self._cell(self.lat[slot], self.lon[slot]), set()).add(slot)
+
+        # Candidate edges from every new detection to its grid neighbours
+        src, dst = [], []
+        for slot in slot_list:
+            neighbours = [n for n in self._neighbour_slots(self.lat[slot], self.lon[slot]) if n != slot]
+            src.extend([slot] * len(neighbours))
+            dst.extend(neighbours)
+        src = np.array(src, dtype=np.int64)
+        dst = np.array(dst, dtype=np.int64)
+        if len(src):
+            lat_r, lon_r = to_radians(self.lat, self.lon)
+            close = haversine_rad(lat_r[src], lon_r[src], lat_r[dst], lon_r[dst]) <= self.radius_km
+            src, dst = src[close], dst[close]
+
+        # Union new detections with each other and with existing clusters.
+        # Nodes are new slots and ("c", cid) for clusters they touch.
+        parent = {}
+        def find(node):
+            parent.setdefault(node, node)
+            while parent[node] != node:
+                parent[node] = parent[parent[node]]
+                node = parent[node]
+            return node
+        def union(a, b):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                parent[ra] = rb
+
+        for slot in slot_list:
+            find(slot)
+        for a, b in zip(src.tolist(), dst.tolist()):
+            cid = int(self.cluster[b])
+            union(a, b if cid < 0 else ("c", cid))
+
+        groups = {}
+        for slot in slot_list:
+            groups.setdefault(find(slot), []).append(slot)
+        touched = {}
+        for node in list(parent):
+            if isinstance(node, tuple):
+                touched.setdefault(find(node), []).append(node[1])
+
+        for root, group in groups.items():
+            cids = touched.get(root, [])
+            if not cids:
+                survivor = self._new_cluster()
+            else:
+                survivor = max(cids, key=lambda c: (len(self.members[c]), -c))
+                self._merge(survivor, [c for c in cids if c != survivor])
+            self._add_to_cluster(survivor, group)
+        return len(fresh)
+
+    def remove(self, keys):
+        """
+        Drops detections by key and re-clusters only the clusters they
+        belonged to. Returns the number of detections removed.
+        """
+        slots = [self.slot_of.pop(key) for key in keys if key in self.slot_of]
+        if not slots:
+            return 0
+
+        affected = set()
+        for slot in slots:
+            del self.key_of[slot]
+            cid = int(self.cluster[slot])
+            affected.add(cid)
+            self.members[cid].discard(slot)
+            cell = self._cell(self.lat[slot], self.lon[slot])
+            self.cells[cell].discard(slot)
+            if not self.cells[cell]:
+                del self.cells[cell]
+            self.cluster[slot] = -1
+            self.free_slots.append(slot)
+
+        for cid in affected:
+            remaining = np.fromiter(sorted(self.members[cid]), dtype=np.int64)
+            if not len(remaining):
+                del self.members[cid], self.sums[cid]
+                continue
+            labels = cluster_labels(self.lat[remaining], self.lon[remaining], self.radius_km)
+            if labels.max() == 0:
+                self._recompute(cid)
+                continue
+
+            # Split: the largest fragment keeps the id, the rest get new ones
+            fragments = [remaining[labels == k] for k in range(labels.max() + 1)]
+            fragments.sort(key=len, reverse=True)
+            self.members[cid] = set(fragments[0].tolist())
+            self._recompute(cid)
+            for fragment in fragments[1:]:
+                self._add_to_cluster(self._new_cluster(), fragment)
+        return len(slots)
+
+    def expire(self, older_than):
+        """
+        Removes detections acquired before older_than (epoch seconds).
+        Detections with an unknown acquisition time (acquired_at == 0, as
+        read_firms_csv leaves them) are kept; sync() or remove() drop them.
+        """
+        live = self.cluster >= 0
+        known = self.acquired_at != 0
+        stale = np.nonzero(live & known & (self.acquired_at < older_than))[0]
+        return self.remove([self.key_of[slot] for slot in stale.tolist()])
+
+    def sync(self, batch):
+        """
+        Makes the tracked set equal to a full feed snapshot (a FireBatch):
+        detections no longer in the feed are removed, new ones inserted.
+        Returns (inserted, removed).
+        """
+        keys = batch.keys()
+        current = set(keys)
+        removed = self.remove([key for key in self.slot_of if key not in current])
+        inserted = self.insert(batch, keys)
+        return inserted, removed
+
+    # ----------------------------------------------------------------- output
+
+    def clusters(self, top_k=None, rank_by="total_frp"):
+        """Top cluster records by rank_by, in cluster_fires' format."""
+        if not self.sums:
+            return []
+        ids = np.fromiter(self.sums, dtype=np.int64, count=len(self.sums))
+        count = np.array([len(self.members[cid]) for cid in ids.tolist()])
+        sums = np.array(list(self.sums.values()), dtype=np.float64)
+        return top_clusters(ids, count, sums[:, 0], sums[:, 1], sums[:, 2], sums[:, 3],
+                            self.radius_km, top_k=top_k, rank_by=rank_by)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, 'rb') as f:
+            return pickle.load(f)
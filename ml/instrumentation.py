@@ -0,0 +1,174 @@
+# FILE: DELHI/ml/instrumentation.py
+"""
+Stage timings and counters for the ml scripts and the causal API.
+
+    import instrumentation
+
+    with instrumentation.span("nasa_live.download"):
+        feed = cache.fetch(url)
+    instrumentation.count("firms.fires_kept", len(fires))
+    instrumentation.write_report("nasa_live")   # ml/output/reports/nasa_live.json
+
+Collection is off unless DELHI_METRICS=1 (or enable() is called). While
+off, span() hands back one shared no-op context manager and count()
+returns straight away, so instrumented code pays a flag check per call.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.path.join(SCRIPT_DIR, "output", "reports")
+# Latest samples kept per span for percentiles
+SAMPLE_WINDOW = 1024
+
+_enabled = os.environ.get("DELHI_METRICS", "0") == "1"
+
+def enable():
+    global _enabled
+    _enabled = True
+
+def disable():
+    global _enabled
+    _enabled = False
+
+def enabled():
+    return _enabled
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.name, time.perf_counter() - self.start)
+        return False
+
+class SpanStats:
+    """Running count/total/max for one span plus a window of recent samples."""
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.samples.append(seconds)
+
+    def to_dict(self):
+        ordered = sorted(self.samples)
+
+        def percentile(q):
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 6)
+
+        return {
+            "count": self.count,
+            "total_s": round(self.total, 6),
+            "mean_s": round(self.total / self.count, 6),
+            "max_s": round(self.max, 6),
+            "p50_s": percentile(0.50),
+            "p95_s": percentile(0.95),
+            "p99_s": percentile(0.99)
+        }
+
+class Metrics:
+    """Thread-safe registry of span timings and counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.spans = {}
+            self.counters = {}
+
+    def span(self, name):
+        """Context manager timing the enclosed block as one sample of name."""
+        if not _enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name, seconds):
+        """Adds a sample timed elsewhere (e.g. in a worker process)."""
+        if not _enabled:
+            return
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = SpanStats()
+            stats.add(seconds)
+
+    def count(self, name, n=1):
+        if not _enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "enabled": _enabled,
+                "started_at": self.started_at,
+                "uptime_s": round(time.time() - self.started_at, 3),
+                "spans": {name: stats.to_dict() for name, stats in sorted(self.spans.items())},
+                "counters": dict(sorted(self.counters.items()))
+            }
+
+metrics = Metrics()
+span = metrics.span
+record = metrics.record
+count = metrics.count
+snapshot = metrics.snapshot
+reset = metrics.reset
+
+def timed(name):
+    """Decorator form of span(name)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with metrics.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def write_report(name, report_dir=REPORT_DIR, **extra):
+    """
+    Writes the current snapshot (plus extra fields) to report_dir/name.json.
+    Does nothing and returns None while collection is disabled.
+    """
+    if not _enabled:
+        return None
+    report = {"run": name, "finished_at": time.time(), **extra, **snapshot()}
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Run report saved to {os.path.relpath(path, SCRIPT_DIR)}")
+    return path
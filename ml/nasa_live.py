@@ -1,69 +1,128 @@
 # FILE: DELHI/ml/nasa_live.py
-import requests
-import io
 import json
 import os
 import datetime
-import math
-
-def haversine_dist(coord1, coord2):
-    lat1, lon1 = coord1
-    lat2, lon2 = coord2
-    R = 6371
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    a = math.sin(dLat/2)**2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dLon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    return R * c
-
-def fetch_live_nasa_data():
-    URL = "https://firms.modaps.eosdis.nasa.gov/data/active_fire/modis-c6.1/csv/MODIS_C6_1_South_Asia_24h.csv"
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    output_path = os.path.join(script_dir, '../src/data/fire_data.json')
+
+import numpy as np
+
+import instrumentation
+from fire_batch import FireBatch
+from firms_cache import FirmsFeedCache
+from firms_ingest import read_firms_csv
+from geodesy import haversine_one_to_many
+from ranking import top_k_indices
+
+MODIS_URL = "https://firms.modaps.eosdis.nasa.gov/data/active_fire/modis-c6.1/csv/MODIS_C6_1_South_Asia_24h.csv"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_PATH = os.path.join(SCRIPT_DIR, '../src/data/fire_data.json')
+
+FIRE_RANK_KEYS = ("impact_score", "frp", "intensity", "confidence")
+# Simulated fires have made-up brightness; their intensity is frp / this
+SIMULATED_INTENSITY_FRP = 150
+
+def fire_intensity(fires, simulated=False):
+    """Per-fire intensity: brightness/400 for satellite data, frp/150 for simulated fires."""
+    if simulated:
+        return fires.frp.astype(np.float64) / SIMULATED_INTENSITY_FRP
+    return fires.intensity
+
+def rank_fires(fires, impact_score, k=50, key="impact_score", intensity=None):
+    """Indices of the top k fires by key, best first, without a full sort."""
+    if key == "impact_score":
+        values = impact_score
+    elif key == "intensity" and intensity is not None:
+        values = intensity
+    elif key in FIRE_RANK_KEYS:
+        values = getattr(fires, key)
+    else:
+        raise ValueError(f"Unknown fire rank key '{key}' (expected one of {', '.join(FIRE_RANK_KEYS)})")
+    return top_k_indices(np.asarray(values, dtype=np.float64), k).tolist()
+
+def update_live_clusters(fires, state_path, top_k=5, rank_by="total_frp"):
+    """
+    Syncs the persisted incremental clusterer with the current feed, so
+    only detections that entered or left the 24h window are reclustered
+    and cluster ids stay stable between polls.
+    """
+    from incremental_clustering import IncrementalFireClusterer
+
+    clusterer = None
+    if os.path.exists(state_path):
+        try:
+            clusterer = IncrementalFireClusterer.load(state_path)
+        except Exception as e:
+            print(f"⚠️ Cluster state unreadable, rebuilding: {e}")
+    if clusterer is None:
+        clusterer = IncrementalFireClusterer()
+
+    inserted, removed = clusterer.sync(fires)
+    print(f"🔄 Cluster update: +{inserted} / -{removed} hotspots, {len(clusterer.members)} zones tracked.")
+
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    clusterer.save(state_path)
+    return clusterer.clusters(top_k=top_k, rank_by=rank_by)
+
+def _load_output(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def fetch_live_nasa_data(url=MODIS_URL, output_path=OUTPUT_PATH, cache=None, force=False,
+                         top_fires=50, fire_rank_key="impact_score", top_clusters=5, cluster_rank_key="total_frp"):
+    cache = cache or FirmsFeedCache()
     
     metadata = {
-        "timestamp": datetime.datetime.now().isoformat(),
+        # Timezone-aware UTC, the same format as snapshot fetched_at
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
         "source": "NASA-MODIS",
         "status": "Live"
     }
     
-    fire_list = []
+    fires = FireBatch.empty()
+    from_feed = False
     
     try:
         print("🛰️ Connecting to NASA FIRMS Satellite Feed...")
-        response = requests.get(URL, timeout=10)
-        response.raise_for_status()
+        with instrumentation.span("nasa_live.download"):
+            feed = cache.fetch(url, timeout=10, force=force)
         
-        # Manual CSV parse since pandas might be missing
-        lines = response.content.decode('utf-8').splitlines()
-        header = lines[0].split(',')
+        # Same bytes as the feed behind the current live output: nothing to
+        # redo. A "Cached" output is rebuilt so its status and timestamp recover.
+        previous = _load_output(output_path)
+        previous_meta = (previous or {}).get("metadata", {})
+        if (not force and previous_meta.get("status") == "Live"
+                and previous_meta.get("feed_sha256") == feed.sha256):
+            print(f"♻️ Feed {feed.status.replace('_', ' ')}: skipping re-clustering.")
+            instrumentation.count("nasa_live.unchanged_feeds")
+            return previous
         
-        for line in lines[1:]:
-            row = line.split(',')
-            if len(row) < len(header): continue
-            
-            lat = float(row[0])
-            lon = float(row[1])
-            conf = int(row[8])
-            bright = float(row[2])
-            frp = float(row[12])
-            
-            # FILTER: Punjab & Haryana Region
-            if 28.0 <= lat <= 32.5 and 73.0 <= lon <= 78.0 and conf > 70:
-                fire_list.append({
-                    "id": len(fire_list),
-                    "position": [lat, lon],
-                    "intensity": bright / 400,
-                    "frp": frp,
-                    "confidence": conf
-                })
+        with instrumentation.span("nasa_live.parse"):
+            fires = read_firms_csv(feed.path)
+        from_feed = True
+        metadata["feed_sha256"] = feed.sha256
         
-        print(f"✅ Success: Detected {len(fire_list)} live fires.")
+        print(f"✅ Success: Detected {len(fires)} live fires.")
 
     except Exception as e:
         print(f"⚠️ NASA Connection Failed: {e}")
-        # TIER 2: CACHE FALLBACK
-        if os.path.exists(output_path):
+        # TIER 2: CACHE FALLBACK (last good snapshot, then last output)
+        snapshot = cache.latest(url)
+        if snapshot.path:
+            print("📁 Switching to CACHED snapshot...")
+            try:
+                with instrumentation.span("nasa_live.parse"):
+                    fires = read_firms_csv(snapshot.path)
+                from_feed = True
+                metadata["status"] = "Cached"
+                metadata["timestamp"] = snapshot.fetched_at or metadata["timestamp"]
+                metadata["feed_sha256"] = snapshot.sha256
+            except Exception as snap_e:
+                print(f"⚠️ Snapshot unreadable: {snap_e}")
+                snapshot = snapshot._replace(path=None)
+        
+        if not snapshot.path and os.path.exists(output_path):
             print("📁 Switching to CACHED Data...")
             try:
                 with open(output_path, 'r') as f:
@@ -74,46 +133,51 @@ def fetch_live_nasa_data():
             except:
                 pass
         
-        # TIER 3: SIMULATION FALLBACK
-        print("🔥 Switching to SIMULATED Data...")
-        metadata["status"] = "Simulated"
-        try:
-            from fire_engine import SatelliteFireDetector
-            detector = SatelliteFireDetector()
-            sim_fires = detector.detect_active_fires()
-            fire_list = [{
-                "id": i,
-                "position": [f['latitude'], f['longitude']],
-                "intensity": f['frp'] / 150,
-                "frp": f['frp'],
-                "confidence": 90 if f['confidence'] == 'high' else 70
-            } for i, f in enumerate(sim_fires)]
-        except Exception as sim_e:
-            print(f"❌ Simulation Failed: {sim_e}")
-            fire_list = []
+        if not snapshot.path:
+            # TIER 3: SIMULATION FALLBACK
+            print("🔥 Switching to SIMULATED Data...")
+            metadata["status"] = "Simulated"
+            try:
+                from fire_engine import SatelliteFireDetector
+                detector = SatelliteFireDetector()
+                fires = detector.detect_active_fires()
+            except Exception as sim_e:
+                print(f"❌ Simulation Failed: {sim_e}")
+                fires = FireBatch.empty()
 
     # POST-PROCESSING: Clusters & Impact
     clusters = []
     try:
-        from fire_clustering import run_clustering
-        clusters = run_clustering(fire_list)
+        with instrumentation.span("nasa_live.clustering"):
+            if from_feed:
+                clusters = update_live_clusters(fires, os.path.join(cache.cache_dir, "clusters.pkl"),
+                                                top_k=top_clusters, rank_by=cluster_rank_key)
+            else:
+                from fire_clustering import run_clustering
+                clusters = run_clustering(fires, top_k=top_clusters, rank_by=cluster_rank_key)
     except Exception as cl_e:
         print(f"⚠️ Clustering failed: {cl_e}")
 
     # Impact Logic (Delhi Centric)
     DELHI_COORDS = [28.6139, 77.2090]
     total_impact = 0
-    impactful_fires = []
+    impact_score = np.empty(0)
     
-    for fire in fire_list:
-        dist = haversine_dist(fire['position'], DELHI_COORDS)
-        # Weight by distance and intensity
-        impact = fire['frp'] / (dist + 1)
-        fire['impact_score'] = round(impact, 2)
-        total_impact += impact
-        impactful_fires.append(fire)
-    
-    impactful_fires.sort(key=lambda x: x['impact_score'], reverse=True)
+    with instrumentation.span("nasa_live.impact"):
+        if len(fires):
+            dist = haversine_one_to_many(DELHI_COORDS, fires.latitude, fires.longitude)
+            # Weight by distance and intensity
+            impact = fires.frp / (dist + 1)
+            total_impact = float(impact.sum())
+            impact_score = np.round(impact, 2)
+        
+        intensity = fire_intensity(fires, simulated=metadata["status"] == "Simulated")
+        # JSON boundary: per-fire dicts for the frontend
+        fire_list = fires.to_records(impact_score=impact_score, intensity=np.round(intensity, 4))
+        impactful_fires = [fire_list[i] for i in rank_fires(fires, impact_score, top_fires, fire_rank_key,
+                                                            intensity=intensity)]
+    instrumentation.count("nasa_live.fires", len(fire_list))
+    instrumentation.count("nasa_live.clusters", len(clusters))
     
     # Final Attribution Stats
     # stubble% = min(45, (total_impact/50) + 5)
@@ -122,7 +186,7 @@ def fetch_live_nasa_data():
     final_data = {
         "metadata": metadata,
         "all_fires": fire_list,
-        "impactful_fires": impactful_fires[:50],
+        "impactful_fires": impactful_fires,
         "clusters": clusters,
         "attribution": {
             "stubble_percentage": round(stubble_pct, 1),
@@ -131,10 +195,13 @@ def fetch_live_nasa_data():
         }
     }
 
-    with open(output_path, 'w') as f:
+    with instrumentation.span("nasa_live.write"), open(output_path, 'w') as f:
         json.dump(final_data, f, indent=2)
     
     return final_data
 
 if __name__ == "__main__":
-    fetch_live_nasa_data()
\ No newline at end of file
+    # DELHI_METRICS=1 writes a run report to output/reports/nasa_live.json
+    with instrumentation.span("nasa_live.total"):
+        data = fetch_live_nasa_data()
+    instrumentation.write_report("nasa_live", status=data.get("metadata", {}).get("status"))
@@ -0,0 +1,28 @@
+# FILE: DELHI/ml/ranking.py
+import numpy as np
+
+def top_k_indices(values, k):
+    """
+    Indices of the k largest values, ordered best first, with ties broken
+    by lower index (same order as a stable descending sort). Uses
+    argpartition so only the survivors are ever sorted. k=None keeps all.
+    """
+    values = np.asarray(values)
+    n = len(values)
+    if k is None or k >= n:
+        k = n
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    if k < n:
+        # The k-th largest value; everything above it survives, and ties at
+        # the threshold are filled in index order
+        threshold = values[np.argpartition(values, n - k)[n - k]]
+        above = np.flatnonzero(values > threshold)
+        ties = np.flatnonzero(values == threshold)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+
+    order = np.lexsort((candidates, -values[candidates]))
+    return candidates[order]
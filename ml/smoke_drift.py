@@ -0,0 +1,164 @@
+# FILE: DELHI/ml/smoke_drift.py
+from dataclasses import dataclass
+
+import numpy as np
+
+from geodesy import EARTH_RADIUS_KM
+
+KM_PER_DEG = np.pi * EARTH_RADIUS_KM / 180
+
+# PM2.5 source strength per MW of FRP: 0.368 kg of dry matter burned per MJ
+# of fire radiative energy (Wooster et al.) x ~8.3 g PM2.5 per kg of crop
+# residue gives ~3.05 g/s per MW.
+PM25_G_PER_S_PER_MW = 0.368 * 8.3
+
+@dataclass
+class WindField:
+    """
+    Gridded wind on a regular lat/lon grid. u (eastward) and v
+    (northward) are in m/s, shaped (hours, n_lat, n_lon); a single
+    (n_lat, n_lon) frame is treated as one hour.
+    """
+    lats: np.ndarray
+    lons: np.ndarray
+    u: np.ndarray
+    v: np.ndarray
+
+    def __post_init__(self):
+        self.lats = np.asarray(self.lats, dtype=np.float64)
+        self.lons = np.asarray(self.lons, dtype=np.float64)
+        self.u = np.asarray(self.u, dtype=np.float64)
+        self.v = np.asarray(self.v, dtype=np.float64)
+        if self.u.ndim == 2:
+            self.u, self.v = self.u[None], self.v[None]
+        if self.u.shape != self.v.shape or self.u.shape[1:] != (len(self.lats), len(self.lons)):
+            raise ValueError(f"Wind grids {self.u.shape}/{self.v.shape} do not match axes ({len(self.lats)}, {len(self.lons)})")
+        # np.interp in at() needs increasing axes; ERA5/GRIB latitudes usually
+        # run north to south, so reorder the axes and the grids to match
+        lat_order, lon_order = np.argsort(self.lats, kind="stable"), np.argsort(self.lons, kind="stable")
+        self.lats, self.lons = self.lats[lat_order], self.lons[lon_order]
+        if np.any(np.diff(self.lats) <= 0) or np.any(np.diff(self.lons) <= 0):
+            raise ValueError("Wind grid axes must not repeat a latitude or longitude")
+        self.u = self.u[:, lat_order][:, :, lon_order]
+        self.v = self.v[:, lat_order][:, :, lon_order]
+
+    @property
+    def hours(self):
+        return self.u.shape[0]
+
+    @classmethod
+    def uniform(cls, direction_deg, speed_ms, hours=1, bbox=(6.0, 36.0, 66.0, 98.0)):
+        """
+        Constant wind blowing *from* direction_deg (meteorological
+        convention, 315 = north-westerly) at speed_ms over bbox.
+        """
+        theta = np.radians(direction_deg)
+        u = np.full((hours, 2, 2), -speed_ms * np.sin(theta))
+        v = np.full((hours, 2, 2), -speed_ms * np.cos(theta))
+        lat_min, lat_max, lon_min, lon_max = bbox
+        return cls([lat_min, lat_max], [lon_min, lon_max], u, v)
+
+    def at(self, lats, lons):
+        """Bilinearly interpolated (u, v) at points, each shaped (hours, n)."""
+        fy = np.interp(lats, self.lats, np.arange(len(self.lats)))
+        fx = np.interp(lons, self.lons, np.arange(len(self.lons)))
+        y0 = np.minimum(np.floor(fy).astype(np.int64), len(self.lats) - 1)
+        x0 = np.minimum(np.floor(fx).astype(np.int64), len(self.lons) - 1)
+        y1 = np.minimum(y0 + 1, len(self.lats) - 1)
+        x1 = np.minimum(x0 + 1, len(self.lons) - 1)
+        wy, wx = fy - y0, fx - x0
+
+        def sample(grid):
+            return ((1 - wy) * (1 - wx) * grid[:, y0, x0] + (1 - wy) * wx * grid[:, y0, x1]
+                    + wy * (1 - wx) * grid[:, y1, x0] + wy * wx * grid[:, y1, x1])
+
+        return sample(self.u), sample(self.v)
+
+class SmokeDriftForecaster:
+    """
+    Straight-line Gaussian plume model for crop-fire smoke. Each fire
+    emits PM2.5 in proportion to its FRP and is advected along the wind
+    at its own location for that hour. Crosswind and vertical spread
+    follow Briggs open-country class D curves, with vertical spread
+    capped at the mixing height. All fire x receptor pairs are evaluated
+    as NumPy blocks of at most chunk_pairs elements.
+    """
+
+    def __init__(self, wind_field, mixing_height_m=1000.0, min_wind_ms=0.5,
+                 max_range_km=800.0, emission_factor=PM25_G_PER_S_PER_MW, chunk_pairs=2_000_000):
+        self.wind_field = wind_field
+        self.mixing_height_m = mixing_height_m
+        self.min_wind_ms = min_wind_ms
+        self.max_range_km = max_range_km
+        self.emission_factor = emission_factor
+        self.chunk_pairs = chunk_pairs
+
+    def _plume(self, dx_km, dy_km, u, v, q):
+        """Ground-level concentration (ug/m3) for one block of fire x receptor offsets."""
+        speed = np.maximum(np.hypot(u, v), self.min_wind_ms)
+        ex, ey = u / speed, v / speed
+        x = (dx_km * ex[:, None] + dy_km * ey[:, None]) * 1000  # downwind, m
+        y = (dy_km * ex[:, None] - dx_km * ey[:, None]) * 1000  # crosswind, m
+
+        downwind = (x > 0) & (x <= self.max_range_km * 1000)
+        x = np.where(downwind, x, 1.0)
+        sigma_y = 0.08 * x / np.sqrt(1 + 0.0001 * x)
+        sigma_z = np.minimum(0.06 * x / np.sqrt(1 + 0.0015 * x), self.mixing_height_m)
+
+        # Ground-level source with ground reflection: 2Q / (2pi sy sz U)
+        conc = (q[:, None] * 1e6 / (np.pi * sigma_y * sigma_z * speed[:, None])) \
+            * np.exp(-0.5 * (y / sigma_y) ** 2)
+        return np.where(downwind, conc, 0.0)
+
+    def forecast(self, fires, receptor_lats, receptor_lons, per_fire=False):
+        """
+        PM2.5 contribution (ug/m3) from fires (a FireBatch) at each
+        receptor for each wind-field hour.
+
+        Returns {"concentration": (hours, receptors)} and, with
+        per_fire=True, "per_fire": (fires, receptors) hour-averaged
+        contributions for attribution.
+        """
+        r_lat = np.asarray(receptor_lats, dtype=np.float64)
+        r_lon = np.asarray(receptor_lons, dtype=np.float64)
+        n_fires, n_receptors = len(fires), len(r_lat)
+        hours = self.wind_field.hours
+
+        concentration = np.zeros((hours, n_receptors))
+        contributions = np.zeros((n_fires, n_receptors)) if per_fire else None
+        if not n_fires or not n_receptors:
+            return {"concentration": concentration, "per_fire": contributions}
+
+        u_all, v_all = self.wind_field.at(fires.latitude, fires.longitude)
+        q_all = fires.frp.astype(np.float64) * self.emission_factor
+
+        step = max(1, self.chunk_pairs // n_receptors)
+        for start in range(0, n_fires, step):
+            sl = slice(start, start + step)
+            f_lat, f_lon = fires.latitude[sl, None], fires.longitude[sl, None]
+            # Local equirectangular offsets (km) from each fire to each receptor
+            dy = (r_lat[None, :] - f_lat) * KM_PER_DEG
+            dx = (r_lon[None, :] - f_lon) * KM_PER_DEG * np.cos(np.radians(0.5 * (r_lat[None, :] + f_lat)))
+            for hour in range(hours):
+                block = self._plume(dx, dy, u_all[hour, sl], v_all[hour, sl], q_all[sl])
+                concentration[hour] += block.sum(axis=0)
+                if per_fire:
+                    contributions[sl] += block / hours
+        return {"concentration": concentration, "per_fire": contributions}
+
+if __name__ == "__main__":
+    import time
+
+    from fire_engine import SatelliteFireDetector
+
+    fires = SatelliteFireDetector().simulate_bulk_fires(10_000, seed=7, bbox=(29.0, 32.0, 73.5, 77.0))
+    # 500 ward-like receptors over Delhi NCT
+    grid_lat, grid_lon = np.meshgrid(np.linspace(28.40, 28.88, 25), np.linspace(76.84, 77.35, 20), indexing="ij")
+    forecaster = SmokeDriftForecaster(WindField.uniform(315, 3.0))
+
+    start = time.perf_counter()
+    result = forecaster.forecast(fires, grid_lat.ravel(), grid_lon.ravel())
+    elapsed = time.perf_counter() - start
+    conc = result["concentration"][0]
+    print(f"✅ {len(fires)} fires x {conc.size} receptors in {elapsed:.3f}s | "
+          f"PM2.5 contribution: mean {conc.mean():.1f}, max {conc.max():.1f} ug/m3")
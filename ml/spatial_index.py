@@ -0,0 +1,95 @@
+# FILE: DELHI/ml/spatial_index.py
+import math
+
+import numpy as np
+
+from geodesy import EARTH_RADIUS_KM
+
+# Own cell, east neighbour and the three cells in the next row up. Walking
+# only this half of the 3x3 stencil visits each pair of cells once.
+HALF_STENCIL = ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+class GridIndex:
+    """
+    Buckets (lat, lon) points into a lat/lon grid whose cells are at least
+    radius_km wide, so any pair of points within radius_km of each other
+    lands in the same or an adjacent cell.
+    """
+
+    def __init__(self, lats, lons, radius_km):
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        self.radius_km = radius_km
+        self.size = len(lats)
+
+        # A great-circle distance d always satisfies d >= R * |dlat|, so a
+        # lat step of radius/R radians can never split a close pair by more
+        # than one row.
+        self.lat_step = math.degrees(radius_km / EARTH_RADIUS_KM)
+
+        # Longitude cells have to be widened by the smallest cos(lat) in the
+        # batch: d >= 2R * asin(cos_min * sin(dlon / 2)).
+        max_abs_lat = float(np.abs(lats).max()) if self.size else 0.0
+        cos_min = math.cos(math.radians(min(max_abs_lat, 90.0)))
+        ratio = radius_km / (2 * EARTH_RADIUS_KM * cos_min) if cos_min > 0 else 1.0
+        min_lon_step = 360.0 if ratio >= 1 else math.degrees(2 * math.asin(ratio))
+        # Round the column count down so every column, including the one
+        # that wraps at the antimeridian, is at least min_lon_step wide
+        self.n_cols = int(360.0 // min_lon_step)
+        if self.n_cols < 3:
+            # Wrapped neighbours would coincide; one column covers the globe
+            self.n_cols = 1
+        self.lon_step = 360.0 / self.n_cols
+        self.stencil = HALF_STENCIL if self.n_cols > 1 else ((0, 0), (1, 0))
+
+        self.rows, self.cols = self.cell_of(lats, lons)
+        keys = self._key(self.rows, self.cols)
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def cell_of(self, lats, lons):
+        rows = np.floor(np.asarray(lats, dtype=np.float64) / self.lat_step).astype(np.int64)
+        cols = np.floor((np.asarray(lons, dtype=np.float64) + 180.0) / self.lon_step).astype(np.int64) % self.n_cols
+        return rows, cols
+
+    def _key(self, rows, cols):
+        # Columns are wrapped around the antimeridian before keying
+        return rows * self.n_cols + cols % self.n_cols
+
+    def candidate_pairs(self, max_pairs=2_000_000):
+        """
+        Yields (i, j) index arrays covering each unordered candidate pair,
+        i != j, exactly once. Chunks are capped at roughly max_pairs pairs
+        so dense batches don't materialise every candidate at once.
+        """
+        if self.size < 2:
+            return
+
+        rows = self.rows[self.order]
+        cols = self.cols[self.order]
+        positions = np.arange(self.size)
+
+        for d_row, d_col in self.stencil:
+            target = self._key(rows + d_row, cols + d_col)
+            start = np.searchsorted(self.sorted_keys, target, side="left")
+            end = np.searchsorted(self.sorted_keys, target, side="right")
+            if d_row == 0 and d_col == 0:
+                # Within a cell only pair each point with the ones after it
+                start = np.maximum(start, positions + 1)
+            counts = np.maximum(end - start, 0)
+
+            cum = np.cumsum(counts)
+            lo = 0
+            while lo < self.size:
+                base = cum[lo - 1] if lo else 0
+                hi = int(np.searchsorted(cum, base + max_pairs, side="right"))
+                hi = max(hi, lo + 1)
+                chunk_counts = counts[lo:hi]
+                total = int(chunk_counts.sum())
+                if total:
+                    src = np.repeat(positions[lo:hi], chunk_counts)
+                    offsets = np.arange(total) - np.repeat(np.cumsum(chunk_counts) - chunk_counts, chunk_counts)
+                    dst = np.repeat(start[lo:hi], chunk_counts) + offsets
+                    yield self.order[src], self.order[dst]
+                lo = hi
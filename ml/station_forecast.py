@@ -0,0 +1,197 @@
+# FILE: DELHI/ml/station_forecast.py
+"""
+Multi-station AQI forecasting. Hourly station readings (the long format
+written by generate_data.py: timestamp, area_id, area_name, aqi, ...) are
+averaged to daily series. One global direct multi-horizon XGBoost model
+is then fitted across all stations, with the station as a feature.
+
+Training is a single threaded histogram fit over every station's rows, so
+adding stations grows the data rather than the number of serial fits.
+Forecasting every station x horizon is one batched predict.
+
+    python ml/station_forecast.py --horizons 7
+"""
+import argparse
+import datetime
+import json
+import os
+import time
+
+import numpy as np
+
+from aqi_features import DIRECT_FEATURE_COLUMNS, N_LAGS, build_direct_training_matrix, direct_matrix, lag_windows
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATION_CSV = os.path.join(SCRIPT_DIR, "data", "cpcb_aqi.csv")
+MODEL_DIR = os.path.join(SCRIPT_DIR, "output", "models")
+OUTPUT_PATH = os.path.join(SCRIPT_DIR, "output", "station_forecasts.json")
+
+STATION_FEATURE_COLUMNS = DIRECT_FEATURE_COLUMNS + ["station_code", "station_level"]
+
+STATION_MODEL_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 5,
+    "learning_rate": 0.05,
+    "objective": "reg:squarederror",
+    "tree_method": "hist",
+    # All cores for one shared fit instead of one serial fit per station
+    "n_jobs": os.cpu_count()
+}
+
+def daily_station_matrix(timestamps, station_ids, aqi):
+    """
+    Averages hourly readings into an (n_stations, n_days) matrix on a
+    shared daily index. Days with no reading are interpolated per station;
+    gaps at either end take the nearest reading.
+    Returns (stations, dates, matrix) with stations sorted by id.
+    """
+    days = np.asarray(timestamps, dtype="datetime64[D]")
+    stations, station_idx = np.unique(np.asarray(station_ids), return_inverse=True)
+    first = days.min()
+    day_idx = (days - first).astype(np.int64)
+    n_days = int(day_idx.max()) + 1
+
+    sums = np.zeros((len(stations), n_days))
+    counts = np.zeros((len(stations), n_days))
+    np.add.at(sums, (station_idx, day_idx), np.asarray(aqi, dtype=np.float64))
+    np.add.at(counts, (station_idx, day_idx), 1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        matrix = sums / counts
+    idx = np.arange(n_days)
+    for row in matrix:
+        missing = np.isnan(row)
+        if missing.any() and not missing.all():
+            row[missing] = np.interp(idx[missing], idx[~missing], row[~missing])
+    return stations, first + np.arange(n_days), matrix
+
+def load_station_readings(path=STATION_CSV, days=30):
+    """
+    Hourly readings as (timestamps, station_ids, names, aqi) arrays.
+    Falls back to generate_data's synthetic stations when path is missing.
+    """
+    if os.path.exists(path):
+        import pandas as pd
+
+        print(f"🔹 Loading station readings from {os.path.relpath(path, SCRIPT_DIR)}...")
+        df = pd.read_csv(path, usecols=["timestamp", "area_id", "area_name", "aqi"])
+        timestamps = pd.to_datetime(df["timestamp"]).to_numpy(dtype="datetime64[s]")
+        return timestamps, df["area_id"].to_numpy(str), df["area_name"].to_numpy(str), df["aqi"].to_numpy(np.float64)
+
+    from generate_data import generate_aqi_data
+
+    print(f"⚠️ {os.path.relpath(path, SCRIPT_DIR)} not found, generating {days} days of synthetic station data...")
+    rows = generate_aqi_data(days)
+    return (
+        np.array([r["timestamp"] for r in rows], dtype="datetime64[s]"),
+        np.array([r["area_id"] for r in rows]),
+        np.array([r["area_name"] for r in rows]),
+        np.array([r["aqi"] for r in rows], dtype=np.float64)
+    )
+
+def station_features(X, codes, levels):
+    return np.column_stack([X, codes, levels])
+
+def build_station_training_matrix(dates, matrix, max_horizon=7):
+    """
+    Direct multi-horizon rows for every station, stacked. Each row carries
+    the station's code and mean level so one model can share trends across
+    stations while keeping their baselines apart.
+    """
+    levels = np.nanmean(matrix, axis=1)
+    X_parts, y_parts = [], []
+    for code, series in enumerate(matrix):
+        X, y, _ = build_direct_training_matrix(dates, series, max_horizon)
+        X_parts.append(station_features(X, np.full(len(y), code), np.full(len(y), levels[code])))
+        y_parts.append(y)
+    return np.concatenate(X_parts), np.concatenate(y_parts), levels
+
+def train_station_model(dates, matrix, max_horizon=7, params=STATION_MODEL_PARAMS):
+    from xgboost import XGBRegressor
+
+    X, y, levels = build_station_training_matrix(dates, matrix, max_horizon)
+    print(f"🔹 Training global station model on {len(y)} rows ({matrix.shape[0]} stations, {params['n_jobs']} threads)...")
+    model = XGBRegressor(**params)
+    model.fit(X, y)
+    booster = model.get_booster()
+    booster.feature_names = list(STATION_FEATURE_COLUMNS)
+    return booster, levels
+
+def forecast_stations(booster, dates, matrix, levels, days=7):
+    """(n_stations, days) forecast from each station's last N_LAGS days, in one predict."""
+    origins = np.full(matrix.shape[0], matrix.shape[1] - 1)
+    lags = np.stack([lag_windows(series, origins[:1])[0] for series in matrix])
+    X = direct_matrix(lags, np.repeat(dates[-1], len(matrix)), np.arange(1, days + 1))
+    codes = np.repeat(np.arange(len(matrix)), days)
+    X = station_features(X, codes, levels[codes])
+    return booster.inplace_predict(X).reshape(len(matrix), days).astype(np.float64)
+
+def save_station_model(booster, stations, levels, max_horizon, model_dir=MODEL_DIR):
+    version = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(model_dir, exist_ok=True)
+    stem = os.path.join(model_dir, f"station_xgb_{version}")
+    booster.save_model(stem + ".ubj")
+    with open(stem + ".schema.json", "w") as f:
+        json.dump({
+            "version": version,
+            "features": list(STATION_FEATURE_COLUMNS),
+            "max_horizon": max_horizon,
+            "stations": [str(s) for s in stations],
+            "station_levels": [float(v) for v in levels]
+        }, f, indent=2)
+    print(f"💾 Station model {version} saved to {os.path.relpath(stem, SCRIPT_DIR)}.ubj")
+    return version
+
+def write_station_forecasts(stations, names, dates, preds, output_path=OUTPUT_PATH):
+    last = dates[-1]
+    output = {
+        "model": "XGBoost Regression (global multi-station, direct multi-horizon)",
+        "data_source": "CPCB station AQI (hourly, aggregated daily)",
+        "forecast_days": preds.shape[1],
+        "stations": [
+            {
+                "id": str(station),
+                "name": names.get(station, str(station)),
+                "last_observed": str(last),
+                "aqi_forecast": [
+                    {"date": str(last + np.timedelta64(h, "D")), "aqi": round(float(p), 2)}
+                    for h, p in enumerate(row, start=1)
+                ]
+            }
+            for station, row in zip(stations, preds)
+        ]
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"🎉 Forecasts for {len(stations)} stations saved to {os.path.relpath(output_path, SCRIPT_DIR)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and forecast AQI for every monitoring station.")
+    parser.add_argument("--csv", default=STATION_CSV, help="hourly station readings (generate_data.py format)")
+    parser.add_argument("--days", type=int, default=30, help="synthetic history to generate when --csv is missing")
+    parser.add_argument("--horizons", type=int, default=7)
+    parser.add_argument("--out", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    timestamps, station_ids, station_names, aqi = load_station_readings(args.csv, args.days)
+    stations, dates, matrix = daily_station_matrix(timestamps, station_ids, aqi)
+    if len(dates) < N_LAGS + args.horizons:
+        print(f"❌ Need at least {N_LAGS + args.horizons} days of readings, got {len(dates)}")
+        exit(1)
+    print(f"🔹 {len(stations)} stations x {len(dates)} days ({dates[0]} to {dates[-1]})")
+
+    start = time.perf_counter()
+    booster, levels = train_station_model(dates, matrix, args.horizons)
+    trained = time.perf_counter()
+    save_station_model(booster, stations, levels, args.horizons)
+
+    preds = forecast_stations(booster, dates, matrix, levels, args.horizons)
+    done = time.perf_counter()
+    print(f"✅ Trained in {trained - start:.2f}s, forecast {preds.size} station-days in {(done - trained) * 1000:.1f} ms")
+
+    names = dict(zip(station_ids, station_names))
+    write_station_forecasts(stations, names, dates, preds, args.out)
+
+if __name__ == "__main__":
+    main()
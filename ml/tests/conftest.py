@@ -0,0 +1,8 @@
+import os
+import sys
+
+ML_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The ml scripts import each other as top-level modules
+for path in (ML_DIR, os.path.join(ML_DIR, "causal")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,110 @@
+import json
+
+import numpy as np
+import pytest
+
+from aqi_features import (DIRECT_FEATURE_COLUMNS, FEATURE_COLUMNS, N_LAGS, build_direct_training_matrix,
+                          build_training_matrix, feature_row)
+from aqi_forecast import artifact_paths, forecast, forecast_many, load_artifact, predict_many
+from train_aqi_model import fit_booster, save_artifact, training_rows
+
+TINY_PARAMS = {"n_estimators": 10, "max_depth": 2, "learning_rate": 0.3, "objective": "reg:squarederror"}
+
+def series(n=120, start="2024-09-01"):
+    dates = np.datetime64(start) + np.arange(n)
+    aqi = 200 + 80 * np.sin(np.arange(n) / 9) + np.random.default_rng(0).normal(0, 5, n)
+    return dates, aqi
+
+def trained_artifact(model_dir, strategy, max_horizon=None):
+    dates, aqi = series()
+    X, y, _, features = training_rows(dates, aqi, strategy, max_horizon or 7)
+    booster = fit_booster(X, y, features, TINY_PARAMS)
+    version = save_artifact(booster, dates, aqi, len(y), TINY_PARAMS, model_dir=str(model_dir),
+                            strategy=strategy, max_horizon=max_horizon)
+    return load_artifact(str(model_dir), version)
+
+def test_training_matrix_lags_line_up():
+    # 2025-01-01 was a Wednesday
+    dates = np.datetime64("2025-01-01") + np.arange(6)
+    aqi = np.array([10.0, 20.0, 30.0, 40.0, 50.0, 60.0])
+    X, y, targets = build_training_matrix(dates, aqi)
+
+    assert X.shape == (len(aqi) - N_LAGS, len(FEATURE_COLUMNS))
+    np.testing.assert_array_equal(y, [40.0, 50.0, 60.0])
+    np.testing.assert_array_equal(targets, dates[N_LAGS:])
+    # aqi_lag1..3 are the three days before the target, most recent first
+    np.testing.assert_array_equal(X[0], [30.0, 20.0, 10.0, 1, 5])   # Saturday 4 January
+    np.testing.assert_array_equal(X[2], [50.0, 40.0, 30.0, 1, 0])   # Monday 6 January
+    # Inference builds the same row from the trailing observations
+    np.testing.assert_array_equal(feature_row(aqi[:5], dates[5]), X[2:3])
+
+def test_direct_matrix_covers_every_horizon():
+    dates = np.datetime64("2025-01-30") + np.arange(6)
+    aqi = np.arange(1.0, 7.0)
+    X, y, targets = build_direct_training_matrix(dates, aqi, max_horizon=2)
+
+    assert X.shape[1] == len(DIRECT_FEATURE_COLUMNS)
+    horizon = X[:, -1]
+    assert (horizon == 1).sum() == len(aqi) - N_LAGS
+    assert (horizon == 2).sum() == len(aqi) - N_LAGS - 1
+    for row, target, target_date in zip(X, y, targets):
+        h = int(row[-1])
+        origin = int(np.flatnonzero(dates == target_date)[0]) - h
+        # Lags come from the origin backwards; calendar features from the target day
+        np.testing.assert_array_equal(row[:N_LAGS], aqi[origin - np.arange(N_LAGS)])
+        assert target == aqi[origin + h]
+        assert row[N_LAGS] == target_date.astype("datetime64[M]").astype(int) % 12 + 1
+
+def test_recursive_forecast_feeds_back_its_predictions(tmp_path):
+    artifact = trained_artifact(tmp_path, "recursive")
+    history = artifact.schema["last_observations"]
+    result = forecast(days=3, model_dir=str(tmp_path), version=artifact.version)
+
+    last = np.datetime64(history["date"])
+    assert [r["date"] for r in result] == [str(last + k) for k in (1, 2, 3)]
+
+    recent = list(history["aqi"])
+    for k, record in enumerate(result, start=1):
+        pred = float(artifact.booster.inplace_predict(feature_row(recent, last + k))[0])
+        assert record["aqi"] == round(pred, 2)
+        recent.append(pred)
+
+def test_direct_and_recursive_output_shapes(tmp_path):
+    dates, aqi = series()
+    recent = np.stack([aqi[10:10 + N_LAGS], aqi[50:50 + N_LAGS]])
+    last_dates = [dates[10 + N_LAGS - 1], dates[50 + N_LAGS - 1]]
+
+    recursive = trained_artifact(tmp_path / "recursive", "recursive")
+    direct = trained_artifact(tmp_path / "direct", "direct", max_horizon=5)
+    assert direct.features == DIRECT_FEATURE_COLUMNS
+
+    for artifact, model_dir in ((recursive, tmp_path / "recursive"), (direct, tmp_path / "direct")):
+        preds = forecast_many(recent, last_dates, days=5, model_dir=str(model_dir), version=artifact.version)
+        assert preds.shape == (2, 5)
+        assert np.isfinite(preds).all()
+        # The first origin alone gives the same row
+        np.testing.assert_allclose(predict_many(artifact.booster, artifact.strategy, recent[:1],
+                                                last_dates[:1], 5), preds[:1])
+
+    with pytest.raises(ValueError, match="at most 5 days"):
+        forecast_many(recent, last_dates, days=6, model_dir=str(tmp_path / "direct"), version=direct.version)
+    with pytest.raises(ValueError, match="recent observations"):
+        forecast_many(recent[:, :2], last_dates, model_dir=str(tmp_path / "recursive"), version=recursive.version)
+
+def test_schema_feature_mismatch_is_rejected(tmp_path):
+    version = trained_artifact(tmp_path, "recursive").version
+    # A fresh directory, so the lru_cache'd artifact above is not reused
+    model_dir = tmp_path / "copy"
+    model_dir.mkdir()
+    for src, dst in zip(artifact_paths(str(tmp_path), version), artifact_paths(str(model_dir), version)):
+        with open(src, "rb") as f_in, open(dst, "wb") as f_out:
+            f_out.write(f_in.read())
+    schema_path = artifact_paths(str(model_dir), version)[1]
+    with open(schema_path) as f:
+        schema = json.load(f)
+    schema["features"] = ["aqi_lag1", "aqi_lag2", "aqi_lag3", "month", "dayofweek"]
+    with open(schema_path, "w") as f:
+        json.dump(schema, f)
+
+    with pytest.raises(ValueError, match="was trained on"):
+        load_artifact(str(model_dir), version)
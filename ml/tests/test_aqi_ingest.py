@@ -0,0 +1,113 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import aqi_ingest
+from aqi_ingest import CPCBWorkbookCache, load_series, parse_long_table
+
+class CountingParser:
+    """parse_long_table that records which files it actually parsed."""
+
+    def __init__(self):
+        self.parsed = []
+
+    def __call__(self, path):
+        self.parsed.append(os.path.basename(path))
+        return parse_long_table(path)
+
+def write_export(path, rows):
+    path.write_text("From Date,AQI\n" + "".join(f"{d},{a}\n" for d, a in rows), encoding="utf-8")
+    return str(path)
+
+@pytest.fixture
+def export(tmp_path):
+    return write_export(tmp_path / "delhi.csv", [("2025-01-01", 310), ("2025-01-02", 295), ("2025-01-03", 280)])
+
+def test_unchanged_file_is_served_from_cache(tmp_path, export):
+    cache_dir = str(tmp_path / "cache")
+    parser = CountingParser()
+    first = CPCBWorkbookCache(cache_dir, parser).load(export)
+    # A new instance reads the manifest written by the first one
+    second = CPCBWorkbookCache(cache_dir, parser).load(export)
+
+    assert parser.parsed == ["delhi.csv"]
+    for a, b in zip(first, second):
+        np.testing.assert_array_equal(a, b)
+    with open(os.path.join(cache_dir, aqi_ingest.MANIFEST)) as f:
+        manifest = json.load(f)
+    entry = manifest["files"]["delhi.csv"]
+    assert manifest["format"] == aqi_ingest.CACHE_FORMAT
+    assert entry["rows"] == 3 and entry["size"] == os.path.getsize(export)
+
+def test_touched_but_identical_file_only_costs_a_hash(tmp_path, export):
+    cache_dir = str(tmp_path / "cache")
+    parser = CountingParser()
+    CPCBWorkbookCache(cache_dir, parser).load(export)
+    stat = os.stat(export)
+    os.utime(export, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    cache = CPCBWorkbookCache(cache_dir, parser)
+    cache.load(export)
+    assert parser.parsed == ["delhi.csv"]
+    assert cache.manifest["delhi.csv"]["mtime_ns"] == os.stat(export).st_mtime_ns
+
+def test_changed_file_is_reparsed(tmp_path, export):
+    cache_dir = str(tmp_path / "cache")
+    parser = CountingParser()
+    CPCBWorkbookCache(cache_dir, parser).load(export)
+    old_npz = CPCBWorkbookCache(cache_dir, parser).manifest["delhi.csv"]["npz"]
+
+    # Same size, new content and mtime: caught by the sha256
+    write_export(tmp_path / "delhi.csv", [("2025-01-01", 310), ("2025-01-02", 295), ("2025-01-03", 281)])
+    stat = os.stat(export)
+    os.utime(export, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    dates, aqi = CPCBWorkbookCache(cache_dir, parser).load(export)
+    assert parser.parsed == ["delhi.csv", "delhi.csv"]
+    assert aqi[-1] == 281
+
+    # Different size
+    write_export(tmp_path / "delhi.csv", [("2025-01-01", 310)])
+    dates, aqi = CPCBWorkbookCache(cache_dir, parser).load(export)
+    assert len(parser.parsed) == 3 and len(aqi) == 1
+    # Superseded arrays are cleaned up
+    assert old_npz not in os.listdir(cache_dir)
+    assert len([f for f in os.listdir(cache_dir) if f.endswith(".npz")]) == 1
+
+@pytest.mark.parametrize("damage, junk", [
+    ("npz", b"PK\x03\x04 truncated"),     # broken zip archive
+    ("npz", b"not an archive"),            # np.load refuses to unpickle
+    ("manifest", b"{"),
+])
+def test_corrupt_cache_falls_back_to_parsing(tmp_path, export, damage, junk):
+    cache_dir = str(tmp_path / "cache")
+    parser = CountingParser()
+    expected = CPCBWorkbookCache(cache_dir, parser).load(export)
+    entry = CPCBWorkbookCache(cache_dir, parser).manifest["delhi.csv"]
+    target = os.path.join(cache_dir, entry["npz"] if damage == "npz" else aqi_ingest.MANIFEST)
+    with open(target, "wb") as f:
+        f.write(junk)
+
+    dates, aqi = CPCBWorkbookCache(cache_dir, parser).load(export)
+    assert parser.parsed == ["delhi.csv", "delhi.csv"]
+    np.testing.assert_array_equal(aqi, expected[1])
+    # The rebuilt cache is good again
+    CPCBWorkbookCache(cache_dir, parser).load(export)
+    assert len(parser.parsed) == 2
+
+def test_old_cache_format_is_rebuilt(tmp_path, export, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    parser = CountingParser()
+    CPCBWorkbookCache(cache_dir, parser).load(export)
+    monkeypatch.setattr(aqi_ingest, "CACHE_FORMAT", aqi_ingest.CACHE_FORMAT + 1)
+    CPCBWorkbookCache(cache_dir, parser).load(export)
+    assert len(parser.parsed) == 2
+
+def test_load_series_interpolates_and_averages(tmp_path):
+    write_export(tmp_path / "a.csv", [("2025-01-01 00:00", 100), ("2025-01-01 12:00", 200),
+                                      ("2025-01-02 00:00", "NA*"), ("2025-01-03 00:00", 300)])
+    parser = CountingParser()
+    dates, aqi = load_series([str(tmp_path / "a.csv")], parser, cache_dir=str(tmp_path / "cache"))
+    np.testing.assert_array_equal(dates, np.datetime64("2025-01-01") + np.arange(3))
+    np.testing.assert_allclose(aqi, [150, 250, 300])
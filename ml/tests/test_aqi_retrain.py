@@ -0,0 +1,102 @@
+import functools
+import json
+
+import numpy as np
+import pytest
+
+import aqi_pipeline
+import train_aqi_model
+from aqi_forecast import ModelArtifact, artifact_paths, forecast, load_artifact
+from train_aqi_model import (DRIFT_TOLERANCE, MIN_DRIFT_SAMPLES, WARM_START_TREES, day_ahead_errors,
+                             full_retrain, retrain_plan, save_artifact, warm_start)
+
+TINY_PARAMS = {"n_estimators": 15, "max_depth": 2, "learning_rate": 0.3, "objective": "reg:squarederror"}
+TRAIN_DAYS = 150
+
+def series(n=TRAIN_DAYS + 20, start="2024-06-01"):
+    dates = np.datetime64(start) + np.arange(n)
+    aqi = 200 + 80 * np.sin(np.arange(n) / 9) + np.random.default_rng(0).normal(0, 5, n)
+    return dates, aqi
+
+@pytest.fixture
+def previous(tmp_path):
+    """A fully trained artifact on the first TRAIN_DAYS days, saved and reloaded."""
+    dates, aqi = series()
+    booster, n_rows, info = full_retrain(dates[:TRAIN_DAYS], aqi[:TRAIN_DAYS], TINY_PARAMS)
+    version = save_artifact(booster, dates[:TRAIN_DAYS], aqi[:TRAIN_DAYS], n_rows, TINY_PARAMS,
+                            model_dir=str(tmp_path), **info)
+    return load_artifact(str(tmp_path), version)
+
+def with_schema(artifact, **changes):
+    return ModelArtifact(artifact.version, artifact.booster, {**artifact.schema, **changes})
+
+def test_plan_for_new_days_is_incremental(previous):
+    dates, aqi = series()
+    assert retrain_plan(None, dates, aqi, TINY_PARAMS)[0] == "full"
+    assert retrain_plan(previous, dates, aqi, TINY_PARAMS)[0] == "incremental"
+    assert retrain_plan(previous, dates[:TRAIN_DAYS], aqi[:TRAIN_DAYS], TINY_PARAMS)[0] == "skip"
+
+def test_plan_forces_full_retrain(previous, monkeypatch):
+    dates, aqi = series()
+    revised = aqi.copy()
+    revised[10] += 1
+    assert retrain_plan(previous, dates, revised, TINY_PARAMS) == \
+        ("full", "history before the last training run changed")
+    assert retrain_plan(previous, dates, aqi, {**TINY_PARAMS, "max_depth": 3})[0] == "full"
+    assert retrain_plan(previous, dates, aqi, TINY_PARAMS, strategy="direct", max_horizon=7)[0] == "full"
+
+    # One more warm start would exceed the tree cap
+    trees = previous.booster.num_boosted_rounds()
+    monkeypatch.setattr(train_aqi_model, "MAX_TREES", trees + WARM_START_TREES - 1)
+    mode, reason = retrain_plan(previous, dates, aqi, TINY_PARAMS)
+    assert mode == "full" and "tree cap" in reason
+    monkeypatch.setattr(train_aqi_model, "MAX_TREES", trees + WARM_START_TREES)
+    assert retrain_plan(previous, dates, aqi, TINY_PARAMS)[0] == "incremental"
+
+def test_warm_start_continues_from_the_saved_booster(previous):
+    dates, aqi = series()
+    # Drift is covered below; here the error is always within tolerance
+    booster, n_rows, info = warm_start(with_schema(previous, reference_mae=1e6), dates, aqi, TINY_PARAMS)
+
+    base_trees = previous.booster.num_boosted_rounds()
+    assert booster.num_boosted_rounds() == base_trees + WARM_START_TREES
+    assert info["training_mode"] == "incremental" and info["parent_version"] == previous.version
+    assert n_rows == previous.schema["trained_rows"] + (len(dates) - TRAIN_DAYS)
+    # The first trees are the previous model's, unchanged
+    X = np.random.default_rng(1).uniform([50, 50, 50, 1, 0], [450, 450, 450, 12, 6], (20, 5))
+    np.testing.assert_allclose(booster.inplace_predict(X, iteration_range=(0, base_trees)),
+                               previous.booster.inplace_predict(X), rtol=1e-6)
+    assert not np.allclose(booster.inplace_predict(X), previous.booster.inplace_predict(X))
+
+def test_warm_start_refuses_when_error_drifts(previous):
+    dates, aqi = series()
+    errors = day_ahead_errors(previous.booster, dates, aqi, previous.features,
+                              after=previous.schema["train_end"])
+    mae = round(float(np.mean(errors)), 3)
+    assert len(errors) >= MIN_DRIFT_SAMPLES
+
+    just_inside = with_schema(previous, reference_mae=mae / (1 + DRIFT_TOLERANCE) * 1.01)
+    assert warm_start(just_inside, dates, aqi, TINY_PARAMS) is not None
+    drifted = with_schema(previous, reference_mae=mae / (1 + DRIFT_TOLERANCE) * 0.99)
+    assert warm_start(drifted, dates, aqi, TINY_PARAMS) is None
+
+    # Too few unseen days to judge drift: keep warm-starting
+    short = TRAIN_DAYS + MIN_DRIFT_SAMPLES - 1
+    assert warm_start(drifted, dates[:short], aqi[:short], TINY_PARAMS) is not None
+
+def test_pipeline_falls_back_to_full_retrain_on_drift(previous, tmp_path, monkeypatch):
+    dates, aqi = series()
+    # Separate from previous's directory: versions have one-second resolution
+    model_dir = str(tmp_path / "models")
+    monkeypatch.setattr(aqi_pipeline, "load_artifact", lambda: with_schema(previous, reference_mae=1e-3))
+    monkeypatch.setattr(aqi_pipeline, "save_artifact", functools.partial(save_artifact, model_dir=model_dir))
+    monkeypatch.setattr(aqi_pipeline, "forecast", functools.partial(forecast, model_dir=model_dir))
+
+    out_dir = tmp_path / "out"
+    version = aqi_pipeline.train_and_forecast(dates, aqi, "test", incremental=True, output_dir=str(out_dir),
+                                              params=TINY_PARAMS)
+    with open(artifact_paths(model_dir, version)[1]) as f:
+        schema = json.load(f)
+    assert schema["training_mode"] == "full"
+    assert schema["trees"] == TINY_PARAMS["n_estimators"]
+    assert (out_dir / "aqi_forecast.json").exists()
@@ -0,0 +1,141 @@
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import causal_api
+from causal_cache import CausalResultsCache
+from causal_executor import InferenceExecutor, JobStore
+from causal_inference import MAX_SCENARIOS, CausalEngine, generate_synthetic_data
+
+# Worker entry points standing in for estimate_for/refute_for; top level so
+# the process pool can pickle them
+def fake_estimate(data_path, delay):
+    time.sleep(delay)
+    return {
+        "current_avg_aqi": 180,
+        "counterfactual_aqi": 150,
+        "total_impact": 30,
+        "confidence_interval": [25, 35],
+        "confidence_level": 95,
+        "p_value": 0.001,
+        "stage_seconds": {"estimation": delay}
+    }
+
+def failing_estimate(data_path, delay):
+    raise RuntimeError("no data")
+
+def fake_refute(data_path, delay):
+    time.sleep(delay)
+    return {"refutation_tests": {"placebo": {"passed": True}}, "refutation_run": {}, "stage_seconds": {"refutation": delay}}
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """causal_api on a small generated dataset with fast stand-in computations."""
+    path = str(tmp_path / "data.csv")
+    generate_synthetic_data(num_days=120, seed=0, output_path=path)
+    monkeypatch.setattr(causal_api, "DATA_PATH", path)
+    monkeypatch.setattr(causal_api, "results_cache", CausalResultsCache(lambda: CausalEngine(path), path))
+    monkeypatch.setattr(causal_api, "executor", InferenceExecutor(1, 4))
+    monkeypatch.setattr(causal_api, "jobs", JobStore())
+    monkeypatch.setattr(causal_api, "warmup", {"status": "pending", "started_at": None, "finished_at": None,
+                                               "error": None})
+    monkeypatch.setitem(causal_api.PART_COMPUTATIONS, "inference", (fake_estimate, (0.5,)))
+    monkeypatch.setitem(causal_api.PART_COMPUTATIONS, "refutation", (fake_refute, (1.0,)))
+    yield causal_api
+    causal_api.executor.shutdown()
+
+def wait_for(client, url, done, timeout=60):
+    deadline = time.monotonic() + timeout
+    seen = []
+    while time.monotonic() < deadline:
+        response = client.get(url)
+        seen.append(response)
+        if done(response):
+            return seen
+        time.sleep(0.05)
+    raise AssertionError(f"{url} never finished: last {seen[-1].status_code} {seen[-1].json()}")
+
+def test_ready_before_and_after_warm_up(api):
+    # Without the lifespan nothing has warmed up
+    response = TestClient(api.app).get("/ready")
+    assert response.status_code == 503 and response.json()["detail"]["status"] == "pending"
+
+    with TestClient(api.app) as client:
+        assert client.get("/health").status_code == 200
+        seen = wait_for(client, "/ready", lambda r: r.status_code == 200)
+        assert seen[0].status_code == 503 and seen[0].json()["detail"]["status"] == "running"
+        assert seen[-1].json()["status"] == "ready"
+
+        # Warm-up filled the estimate; refutations follow as a background job
+        assert api.results_cache.cached() is not None
+        assert client.get("/causal/fire-impact").json()["ate"] == -30
+        job = wait_for(client, "/causal/jobs/refutation-1", lambda r: r.json()["status"] == "done")[-1].json()
+        assert job["kind"] == "refutation" and job["result"]["refutation_tests"]["placebo"]["passed"]
+        assert client.get("/causal/refutation-tests").json() == {"placebo": {"passed": True}}
+
+def test_failed_warm_up_stays_unready(api, monkeypatch):
+    monkeypatch.setitem(api.PART_COMPUTATIONS, "inference", (failing_estimate, (0,)))
+    with TestClient(api.app) as client:
+        seen = wait_for(client, "/ready", lambda r: r.json()["detail"]["status"] == "failed")
+        assert seen[-1].status_code == 503
+        assert "no data" in seen[-1].json()["detail"]["error"]
+
+@pytest.mark.parametrize("scenario, message", [
+    ({"wind_direction": "XX"}, "Unknown wind_direction"),
+    ({"fire_reduction_percent": 150}, "between 0 and 100"),
+    ({"fire_reduction_percent": -5}, "between 0 and 100"),
+    ({"traffic_change_percent": -150}, "below -100"),
+])
+def test_invalid_scenarios_get_400(api, scenario, message):
+    with TestClient(api.app) as client:
+        response = client.post("/causal/scenarios", json={"scenarios": [{"fire_reduction_percent": 50}, scenario]})
+        assert response.status_code == 400
+        assert message in response.json()["detail"]
+
+def test_scenario_batch_limit_and_valid_batch(api):
+    with TestClient(api.app) as client:
+        too_many = client.post("/causal/scenarios", json={"scenarios": [{}] * (MAX_SCENARIOS + 1)})
+        assert too_many.status_code == 400
+        response = client.post("/causal/scenarios", json={"scenarios": [
+            {"fire_reduction_percent": 50}, {"fire_reduction_percent": 50, "wind_direction": "NW"}]})
+        assert response.status_code == 200
+        assert len(response.json()["scenarios"]) == 2
+
+def test_invalid_segment_requests_get_400_without_fitting(api):
+    client = TestClient(api.app)
+    unknown = client.get("/causal/segment-effects", params={"by": "nope"})
+    assert unknown.status_code == 400 and "Cannot segment by" in unknown.json()["detail"]
+    unfiltered = client.get("/causal/segment-effects", params={"by": "wind_direction", "month": 11})
+    assert unfiltered.status_code == 400 and "need matching 'by' columns" in unfiltered.json()["detail"]
+    assert api.results_cache.engine()._segment_effects == {}
+
+    ok = client.get("/causal/segment-effects", params={"by": ["wind_direction", "month"], "month": 1, "min_rows": 1})
+    assert ok.status_code == 200
+    assert ok.json()["segments"] and all(s["segment"]["month"] == 1 for s in ok.json()["segments"])
+
+def test_job_status_lifecycle(api):
+    with TestClient(api.app) as client:
+        wait_for(client, "/ready", lambda r: r.status_code == 200)
+        wait_for(client, "/causal/jobs/refutation-1", lambda r: r.json()["status"] == "done")
+
+        submitted = client.post("/causal/jobs", json={"kind": "refutation", "force": True})
+        assert submitted.status_code == 202
+        job = submitted.json()
+        assert job["status"] == "pending" and job["started_at"] is None
+        url = f"/causal/jobs/{job['job_id']}"
+
+        statuses = [r.json()["status"] for r in wait_for(client, url, lambda r: r.json()["status"] == "done")]
+        assert "running" in statuses
+        assert statuses.index("running") < statuses.index("done")
+        # A matching submission while it runs would have returned the same job; once done it is a new one
+        again = client.post("/causal/jobs", json={"kind": "refutation", "force": True}).json()
+        assert again["job_id"] != job["job_id"]
+        assert client.post("/causal/jobs", json={"kind": "refutation", "force": True}).json()["job_id"] == again["job_id"]
+
+        done = client.get(url).json()
+        assert done["result"]["refutation_tests"] == {"placebo": {"passed": True}}
+        assert done["started_at"] <= done["finished_at"]
+
+        assert client.post("/causal/jobs", json={"kind": "nope"}).status_code == 400
+        assert client.get("/causal/jobs/missing-1").status_code == 404
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+import time
+
+import pytest
+
+import causal_inference
+from causal_cache import CausalResultsCache
+from causal_inference import CausalEngine, generate_synthetic_data
+
+class FakeEngine:
+    """Stands in for CausalEngine: fingerprint is the file hash, each part counts its runs."""
+
+    def __init__(self, path, delay=0.0):
+        with open(path, "rb") as f:
+            self.key = hashlib.sha256(f.read()).hexdigest()
+        self.delay = delay
+        self.calls = {"estimate": 0, "refute": 0}
+
+    def fingerprint(self):
+        return self.key
+
+    def _run(self, part):
+        self.calls[part] += 1
+        time.sleep(self.delay)
+        return {"part": part, "key": self.key}
+
+    def estimate(self):
+        return self._run("estimate")
+
+    def refute(self):
+        return self._run("refute")
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("fire_count,aqi\n1,100\n", encoding="utf-8")
+    return path
+
+def rewrite(path, text):
+    # Bump mtime explicitly; some filesystems keep it within one tick
+    stat = os.stat(path)
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def make_cache(path, **kwargs):
+    return CausalResultsCache(lambda: FakeEngine(str(path), **kwargs), str(path))
+
+def test_parts_are_computed_once_and_separately(data_file):
+    cache = make_cache(data_file)
+    assert cache.cached() is None and cache.cached("refutation") is None
+
+    first = cache.get()
+    assert first["part"] == "estimate"
+    assert cache.get() is first
+    assert cache.cached() is first
+    assert cache.cached("refutation") is None
+    engine = cache.engine()
+    assert engine.calls == {"estimate": 1, "refute": 0}
+
+    assert cache.get("refutation")["part"] == "refute"
+    status = cache.status()
+    assert status["cached"] and status["key"] == engine.key
+    assert all(part["cached"] and part["compute_seconds"] is not None for part in status["parts"].values())
+
+def test_data_change_drops_every_part(data_file):
+    cache = make_cache(data_file)
+    cache.get()
+    cache.get("refutation")
+    old_key = cache.current_key()
+
+    rewrite(data_file, "fire_count,aqi\n2,180\n")
+    assert cache.cached() is None and cache.cached("refutation") is None
+    assert cache.get()["key"] != old_key
+    # The estimate was recomputed for the new data; the stale refutation is gone
+    assert cache.status()["parts"]["refutation"]["cached"] is False
+    assert cache.engine().calls == {"estimate": 1, "refute": 0}
+
+def test_store_ignores_results_for_a_stale_key(data_file):
+    cache = make_cache(data_file)
+    old_key = cache.current_key()
+    rewrite(data_file, "fire_count,aqi\n3,250\n")
+    new_key = cache.current_key()
+
+    cache.store(old_key, {"part": "late"})
+    assert cache.cached() is None
+    cache.store(new_key, {"part": "refute"}, 1.5, part="refutation")
+    assert cache.cached("refutation") == {"part": "refute"}
+    assert cache.cached() is None
+    assert cache.status()["parts"]["refutation"]["compute_seconds"] == 1.5
+
+def test_invalidate_rebuilds_the_engine(data_file):
+    cache = make_cache(data_file)
+    cache.get()
+    engine = cache.engine()
+    cache.invalidate()
+    assert cache.status()["key"] is None and cache.cached() is None
+    cache.get()
+    assert cache.engine() is not engine
+    assert cache.engine().calls["estimate"] == 1
+
+def test_concurrent_misses_compute_once(data_file):
+    cache = make_cache(data_file, delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 4 and all(r is results[0] for r in results)
+    assert cache.engine().calls["estimate"] == 1
+
+def test_engine_fingerprint_tracks_data_and_configuration(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    generate_synthetic_data(num_days=30, seed=0, output_path=path)
+    key = CausalEngine(path).fingerprint()
+    assert CausalEngine(path).fingerprint() == key
+
+    monkeypatch.setattr(causal_inference, "CONFIDENCE_LEVEL", 90)
+    assert CausalEngine(path).fingerprint() != key
+    monkeypatch.undo()
+
+    generate_synthetic_data(num_days=30, seed=1, output_path=path)
+    assert CausalEngine(path).fingerprint() != key
@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from causal_inference import (MAX_SCENARIOS, CausalEngine, backdoor_design, bootstrap_ate, bootstrap_draws,
+                              evaluate_scenarios, fit_scenario_model, generate_synthetic_data, scenario_design,
+                              segment_effects)
+
+COMMON = ["wind_speed_kmh"]
+MODIFIERS = ["traffic_density"]
+
+def synthetic(n=3000, seed=0, effects=None):
+    """
+    Confounded panel with a known effect: aqi rises by effects[wind] +
+    0.2 * traffic_density per fire, and wind speed drives both fires and aqi.
+    """
+    effects = effects or {"NW": 0.6, "S": 0.2}
+    rng = np.random.default_rng(seed)
+    wind = rng.choice(list(effects), n)
+    wind_speed = rng.uniform(2, 12, n)
+    traffic = rng.uniform(0.5, 1.5, n)
+    fires = rng.uniform(0, 300, n) * (12 - wind_speed) / 10
+    slope = np.vectorize(effects.get)(wind) + 0.2 * traffic
+    aqi = 80 + slope * fires - 4 * wind_speed + 30 * traffic + rng.normal(0, 10, n)
+    dates = np.datetime64("2024-01-01") + rng.integers(0, 366, n)
+    return pd.DataFrame({"date": dates.astype(str), "fire_count": fires, "aqi": aqi, "wind_speed_kmh": wind_speed,
+                         "traffic_density": traffic, "wind_direction": wind})
+
+def test_bootstrap_draws_match_resampled_least_squares():
+    df = synthetic(n=200)
+    X, y, _ = backdoor_design(df, COMMON, MODIFIERS)
+    w, coefs = next(bootstrap_draws(X, y, replicates=5, seed=3))
+    for weights, beta in zip(w, coefs):
+        rows = np.repeat(np.arange(len(y)), weights.astype(int))
+        np.testing.assert_allclose(beta, np.linalg.lstsq(X[rows], y[rows], rcond=None)[0], rtol=1e-6, atol=1e-8)
+
+def test_bootstrap_draws_survive_resamples_missing_a_regime():
+    # Two "W" rows: most resamples leave out the W dummy and its interaction entirely
+    df = pd.concat([synthetic(n=200), synthetic(n=2, seed=1, effects={"W": 0.9})], ignore_index=True)
+    X, y, _, regimes = scenario_design(df, COMMON, MODIFIERS)
+    assert regimes == ["NW", "S", "W"]
+    w, coefs = next(bootstrap_draws(X, y, replicates=50, seed=0))
+    assert np.isfinite(coefs).all()
+    missing = np.nonzero(w[:, -2:].sum(axis=1) == 0)[0]
+    assert len(missing)
+    for i in missing[:5]:
+        rows = np.repeat(np.arange(len(y)), w[i].astype(int))
+        np.testing.assert_allclose(coefs[i], np.linalg.lstsq(X[rows], y[rows], rcond=None)[0], rtol=1e-5, atol=1e-6)
+
+    model = fit_scenario_model(df, COMMON, MODIFIERS, replicates=200)
+    assert np.isfinite(model["draws"]).all()
+
+def test_bootstrap_ate_recovers_known_effect():
+    df = synthetic(effects={"NW": 0.5, "S": 0.5})
+    true_ate = 0.5 + 0.2 * df["traffic_density"].mean()
+    result = bootstrap_ate(df, COMMON, MODIFIERS, replicates=400)
+
+    assert result["ate"] == pytest.approx(true_ate, abs=0.02)
+    assert result["ci_low"] < result["ate"] < result["ci_high"]
+    assert result["ci_low"] < true_ate < result["ci_high"]
+    assert result["std_error"] > 0
+    assert result["p_value"] == pytest.approx(1 / 401)
+    # Same seed, same draws
+    assert bootstrap_ate(df, COMMON, MODIFIERS, replicates=400) == result
+
+    wide = bootstrap_ate(df, COMMON, MODIFIERS, replicates=400, confidence_level=99)
+    assert wide["ci_low"] < result["ci_low"] and wide["ci_high"] > result["ci_high"]
+
+def test_bootstrap_p_value_without_an_effect():
+    df = synthetic(effects={"NW": 0.0, "S": 0.0})
+    df["aqi"] -= 0.2 * df["traffic_density"] * df["fire_count"]
+    result = bootstrap_ate(df, COMMON, MODIFIERS, replicates=400)
+    assert result["ci_low"] < 0 < result["ci_high"]
+    assert result["p_value"] > 0.05
+
+def test_segment_effects_match_per_segment_regressions():
+    df = pd.concat([synthetic(), synthetic(n=12, seed=1, effects={"E": 0.9})], ignore_index=True)
+    result = segment_effects(df, ["wind_direction"], COMMON, MODIFIERS)
+
+    segments = {s["segment"]["wind_direction"]: s for s in result["segments"]}
+    assert set(segments) == {"NW", "S"}
+    assert result["skipped"] == [{"segment": {"wind_direction": "E"}, "rows": 12}]
+
+    for wind, true_slope in (("NW", 0.6), ("S", 0.2)):
+        part = df[df["wind_direction"] == wind]
+        X, y, modifiers = backdoor_design(part, COMMON, MODIFIERS)
+        beta, *_ = np.linalg.lstsq(X, y, rcond=None)
+        cate = beta[1] + beta[3] * modifiers.mean()
+        # Classic OLS standard error of c'beta
+        c = np.array([0, 1, 0, modifiers.mean()])
+        sigma2 = np.sum((y - X @ beta) ** 2) / (len(y) - X.shape[1])
+        se = np.sqrt(sigma2 * c @ np.linalg.inv(X.T @ X) @ c)
+
+        segment = segments[wind]
+        assert segment["rows"] == len(part)
+        assert segment["cate_per_fire"] == pytest.approx(cate, abs=1e-4)
+        assert segment["std_error"] == pytest.approx(se, abs=1e-4)
+        assert segment["cate_per_fire"] == pytest.approx(true_slope + 0.2 * modifiers.mean(), abs=0.03)
+        low, high = segment["confidence_interval"]
+        assert low < segment["cate_per_fire"] < high
+        assert segment["p_value"] < 1e-6
+
+def test_segment_min_rows_and_combined_keys():
+    df = synthetic()
+    by_month = segment_effects(df, ["wind_direction", "month"], COMMON, MODIFIERS, min_rows=1)
+    assert len(by_month["segments"]) == 24
+    assert {tuple(sorted(s["segment"])) for s in by_month["segments"]} == {("month", "wind_direction")}
+    assert sum(s["rows"] for s in by_month["segments"]) == len(df)
+
+    strict = segment_effects(df, ["wind_direction", "month"], COMMON, MODIFIERS, min_rows=130)
+    kept = {(s["segment"]["wind_direction"], s["segment"]["month"]) for s in strict["segments"]}
+    assert all(s["rows"] >= 130 for s in strict["segments"])
+    assert all(s["rows"] < 130 for s in strict["skipped"])
+    assert len(kept) + len(strict["skipped"]) == 24
+
+def design(df):
+    """scenario_design's columns with the regime levels fixed to NW (reference) and S."""
+    t, south = df["fire_count"].to_numpy(), (df["wind_direction"] == "S").to_numpy(dtype=np.float64)
+    return np.column_stack([np.ones(len(df)), t, df["wind_speed_kmh"], df["traffic_density"], south,
+                            t * df["traffic_density"], t * south])
+
+def test_scenarios_match_predictions_on_counterfactual_data():
+    df = synthetic()
+    model = fit_scenario_model(df, COMMON, MODIFIERS, replicates=300)
+    X, _, _, regimes = scenario_design(df, COMMON, MODIFIERS)
+    assert regimes == ["NW", "S"]
+    np.testing.assert_array_equal(X, design(df))
+    scenarios = [
+        {"fire_reduction_percent": 100.0},
+        {"fire_reduction_percent": 40.0, "traffic_change_percent": -20.0},
+        {"fire_reduction_percent": 10.0, "wind_direction": "S"},
+        {},
+    ]
+    results = evaluate_scenarios(model, scenarios)
+
+    for scenario, result in zip(scenarios, results):
+        counterfactual = df.copy()
+        counterfactual["fire_count"] *= 1 - scenario.get("fire_reduction_percent", 0) / 100
+        counterfactual["traffic_density"] *= 1 + scenario.get("traffic_change_percent", 0) / 100
+        if "wind_direction" in scenario:
+            counterfactual["wind_direction"] = scenario["wind_direction"]
+        expected = (design(counterfactual) @ model["beta"]).mean() - (design(df) @ model["beta"]).mean()
+
+        assert result["aqi_reduction"] == pytest.approx(-expected, abs=0.06)
+        assert result["new_predicted_aqi"] == pytest.approx(model["current_avg_aqi"] + expected, abs=0.06)
+        low, high = result["confidence_interval"]
+        assert low <= result["aqi_reduction"] <= high
+
+    # Removing every fire removes the whole fire effect, and a no-op changes nothing
+    true_effect = ((np.vectorize({"NW": 0.6, "S": 0.2}.get)(df["wind_direction"]) + 0.2 * df["traffic_density"])
+                   * df["fire_count"]).mean()
+    assert results[0]["aqi_reduction"] == pytest.approx(true_effect, rel=0.02)
+    assert results[3]["aqi_reduction"] == 0.0 and results[3]["confidence_interval"] == [0.0, 0.0]
+
+def test_scenario_parameters_are_validated():
+    df = synthetic(n=300)
+    model = fit_scenario_model(df, COMMON, MODIFIERS, replicates=50)
+    with pytest.raises(ValueError, match="Unknown wind_direction"):
+        evaluate_scenarios(model, [{"wind_direction": "E"}])
+    no_traffic = fit_scenario_model(df, COMMON, [], replicates=50)
+    with pytest.raises(ValueError, match="traffic_density"):
+        evaluate_scenarios(no_traffic, [{"traffic_change_percent": 10.0}])
+    # Fire-only scenarios need no traffic modifier
+    assert evaluate_scenarios(no_traffic, [{"fire_reduction_percent": 50.0}])[0]["aqi_reduction"] > 0
+
+def test_engine_rejects_bad_parameters_before_fitting(tmp_path):
+    path = str(tmp_path / "data.csv")
+    generate_synthetic_data(num_days=60, seed=0, output_path=path)
+    engine = CausalEngine(path)
+    with pytest.raises(ValueError, match="Cannot segment by"):
+        engine.effects_by_segment(["district"])
+    with pytest.raises(ValueError, match=f"At most {MAX_SCENARIOS}"):
+        engine.evaluate_scenarios([{}] * (MAX_SCENARIOS + 1))
+    assert engine._scenario_model is None and engine._adjustment_sets is None
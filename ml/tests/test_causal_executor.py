@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from causal_executor import ExecutorBusy, InferenceExecutor, JobStore
+
+def record_call(path, value, delay=0.3):
+    """Worker entry point: logs one line per actual run, then returns value."""
+    with open(path, "a") as f:
+        f.write(f"{value}\n")
+    time.sleep(delay)
+    return value * 2
+
+def test_same_key_runs_once(tmp_path):
+    log = tmp_path / "calls.log"
+
+    async def main():
+        executor = InferenceExecutor(max_workers=2, max_queued=4)
+        try:
+            return await asyncio.gather(*(executor.run("key", record_call, str(log), 21) for _ in range(3)))
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(main()) == [42, 42, 42]
+    assert log.read_text().splitlines() == ["21"]
+
+def test_distinct_keys_run_separately(tmp_path):
+    log = tmp_path / "calls.log"
+
+    async def main():
+        executor = InferenceExecutor(max_workers=2, max_queued=4)
+        try:
+            return await asyncio.gather(executor.run("a", record_call, str(log), 1),
+                                        executor.run("b", record_call, str(log), 2))
+        finally:
+            executor.shutdown()
+
+    assert asyncio.run(main()) == [2, 4]
+    assert sorted(log.read_text().splitlines()) == ["1", "2"]
+
+def test_busy_when_queue_full(tmp_path):
+    log = tmp_path / "calls.log"
+
+    async def main():
+        executor = InferenceExecutor(max_workers=1, max_queued=1)
+        try:
+            first = asyncio.ensure_future(executor.run("a", record_call, str(log), 1))
+            await asyncio.sleep(0)
+            assert executor.inflight == 1
+            with pytest.raises(ExecutorBusy):
+                await executor.run("b", record_call, str(log), 2)
+            # The same key still coalesces onto the in-flight computation
+            second = await executor.run("a", record_call, str(log), 1)
+            assert await first == second == 2
+            assert executor.inflight == 0
+        finally:
+            executor.shutdown()
+
+    asyncio.run(main())
+    assert log.read_text().splitlines() == ["1"]
+
+def test_job_goes_pending_running_done():
+    async def main():
+        jobs = JobStore()
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return {"ok": True}
+
+        job = jobs.submit("inference", "key", work)
+        assert job.status == "pending" and job.started_at is None
+        await asyncio.sleep(0)
+        assert job.status == "running" and job.started_at is not None
+        # Resubmitting while it runs returns the same job
+        assert jobs.submit("inference", "key", work) is job
+
+        release.set()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert job.status == "done"
+        assert job.to_dict()["result"] == {"ok": True}
+        assert jobs.get(job.id) is job
+        # A finished job is not reused
+        assert jobs.submit("inference", "key", work) is not job
+
+    asyncio.run(main())
+
+def test_job_failure_is_reported():
+    async def main():
+        jobs = JobStore()
+
+        async def work():
+            raise ValueError("no data")
+
+        job = jobs.submit("refutation", "key", work)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert job.status == "failed"
+        assert job.to_dict()["error"] == "no data"
+        assert job.finished_at is not None
+
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+import datetime
+
+from fire_batch import FireBatch
+from fire_engine import SatelliteFireDetector
+
+def test_detect_active_fires_keeps_time_and_satellite():
+    fires = SatelliteFireDetector().detect_active_fires()
+    assert isinstance(fires, FireBatch)
+    assert 40 <= len(fires) <= 60
+    assert fires.source == "NASA-VIIRS"
+    assert (fires.acquired_at > 0).all()
+
+def test_detection_records_keep_the_dict_contract():
+    records = SatelliteFireDetector().detect_active_fire_records()
+    assert 40 <= len(records) <= 60
+    for record in records:
+        assert set(record) == {"latitude", "longitude", "brightness", "frp",
+                               "acquisition_time", "confidence", "satellite"}
+        assert record["satellite"] == "NASA-VIIRS"
+        assert record["confidence"] in ("nominal", "high")
+        assert datetime.datetime.fromisoformat(record["acquisition_time"]).tzinfo is not None
+
+def test_numeric_confidence_passes_through():
+    fires = FireBatch([30.0], [75.0], [320.0], [12.5], [85], [1730439000], source="NASA-MODIS")
+    record, = fires.to_detection_records()
+    assert record["confidence"] == 85
+    assert record["acquisition_time"] == "2024-11-01T05:30:00+00:00"
+    assert record["frp"] == 12.5
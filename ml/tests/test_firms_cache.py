@@ -0,0 +1,115 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from firms_cache import FirmsFeedCache
+
+class FeedServer:
+    """Local FIRMS stand-in: serves `body` with an ETag derived from it."""
+
+    def __init__(self):
+        self.body = b"latitude,longitude\n30,75\n"
+        self.etags = True
+        self.forced = []          # statuses to answer with before behaving normally
+        self.requests = []        # request headers, one dict per request
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                etag = f'"{hash(server.body) & 0xffffffff:x}"'
+                if server.forced:
+                    status = server.forced.pop(0)
+                elif server.etags and self.headers.get("If-None-Match") == etag:
+                    status = 304
+                else:
+                    status = 200
+                self.send_response(status)
+                if status == 200:
+                    if server.etags:
+                        self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(server.body)))
+                self.end_headers()
+                if status == 200:
+                    self.wfile.write(server.body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/MODIS_24h.csv"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def server():
+    feed = FeedServer()
+    yield feed
+    feed.close()
+
+def tmp_files(cache):
+    return [n for n in os.listdir(cache.cache_dir) if n.endswith(".tmp")]
+
+def test_first_fetch_downloads_snapshot(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0)
+    feed = cache.fetch(server.url)
+    assert feed.status == "updated" and feed.changed
+    with open(feed.path, "rb") as f:
+        assert f.read() == server.body
+    assert cache.snapshots() == [feed.path]
+    assert tmp_files(cache) == []
+
+def test_poll_inside_ttl_skips_network(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=300)
+    first = cache.fetch(server.url)
+    second = cache.fetch(server.url)
+    assert second.status == "fresh" and second.path == first.path
+    assert len(server.requests) == 1
+
+def test_unchanged_feed_costs_a_304(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0)
+    first = cache.fetch(server.url)
+    second = cache.fetch(server.url)
+    assert second.status == "not_modified"
+    assert second.path == first.path and second.sha256 == first.sha256
+    assert "If-None-Match" in server.requests[-1]
+
+def test_identical_body_is_deduplicated_by_sha(server, tmp_path):
+    server.etags = False
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0)
+    first = cache.fetch(server.url)
+    second = cache.fetch(server.url)
+    assert second.status == "unchanged" and second.path == first.path
+    assert cache.snapshots() == [first.path]
+    assert tmp_files(cache) == []
+
+def test_new_bodies_rotate_old_snapshots(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0, keep_snapshots=2)
+    paths = []
+    for i in range(4):
+        server.body = f"latitude,longitude\n30,{70 + i}\n".encode()
+        feed = cache.fetch(server.url)
+        assert feed.status == "updated"
+        paths.append(feed.path)
+    assert len(set(paths)) == 4
+    assert cache.snapshots() == paths[-2:]
+    assert cache.latest(server.url).path == paths[-1]
+
+def test_304_without_snapshot_refetches_unconditionally(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0)
+    server.forced = [304]
+    feed = cache.fetch(server.url)
+    assert feed.status == "updated" and feed.path is not None
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[-1]
+
+def test_repeated_304_without_snapshot_is_an_error(server, tmp_path):
+    cache = FirmsFeedCache(str(tmp_path), ttl_seconds=0)
+    server.forced = [304, 304]
+    with pytest.raises(RuntimeError):
+        cache.fetch(server.url)
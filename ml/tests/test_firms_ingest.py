@@ -0,0 +1,107 @@
+import calendar
+import datetime
+
+import numpy as np
+import pytest
+
+from firms_ingest import read_firms_csv
+
+MODIS_HEADER = "latitude,longitude,brightness,scan,track,acq_date,acq_time,satellite,confidence,version,bright_t31,frp,daynight"
+
+def write_csv(tmp_path, lines, name="feed.csv"):
+    path = tmp_path / name
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def epoch(date, hhmm):
+    day = datetime.datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
+    return calendar.timegm(day.timetuple()) + (hhmm // 100) * 3600 + (hhmm % 100) * 60
+
+def test_reads_modis_columns(tmp_path):
+    path = write_csv(tmp_path, [
+        MODIS_HEADER,
+        "30.5,75.25,320.1,1,1,2025-11-01,0530,T,85,6.1NRT,290.2,12.5,D",
+    ])
+    fires = read_firms_csv(path)
+    assert len(fires) == 1
+    assert fires.latitude[0] == 30.5 and fires.longitude[0] == 75.25
+    assert fires.brightness[0] == pytest.approx(320.1)
+    assert fires.frp[0] == pytest.approx(12.5)
+    assert fires.confidence[0] == 85
+    assert fires.source == "NASA-MODIS"
+
+def test_viirs_header_aliases_and_confidence_classes(tmp_path):
+    path = write_csv(tmp_path, [
+        " LATITUDE , Longitude ,bright_ti4,acq_date,acq_time,confidence,frp",
+        "30,75,330.0,2025-11-01,0100,h,4.0",
+        "30,75,331.0,2025-11-01,0100,n,4.0",
+    ])
+    fires = read_firms_csv(path, source_name="NASA-VIIRS")
+    # "n" maps to 70, which is not strictly above MIN_CONFIDENCE
+    assert len(fires) == 1
+    assert fires.brightness[0] == pytest.approx(330.0)
+    assert fires.confidence[0] == 90
+    assert fires.source == "NASA-VIIRS"
+
+def test_missing_required_column_raises(tmp_path):
+    path = write_csv(tmp_path, ["latitude,longitude,confidence,frp", "30,75,80,1"])
+    with pytest.raises(ValueError, match="brightness"):
+        read_firms_csv(path)
+
+def test_empty_file_raises(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("")
+    with pytest.raises(ValueError):
+        read_firms_csv(str(path))
+
+def test_bbox_and_confidence_filters(tmp_path):
+    path = write_csv(tmp_path, [
+        "latitude,longitude,brightness,confidence,frp",
+        "30,75,300,80,1",     # kept
+        "27.9,75,300,80,2",   # south of the bbox
+        "30,78.1,300,80,3",   # east of the bbox
+        "32.5,73,300,80,4",   # on the bbox corner: kept
+        "30,75,300,70,5",     # confidence must be strictly above 70
+        "30,75,300,71,6",     # kept
+    ])
+    fires = read_firms_csv(path)
+    assert fires.frp.tolist() == [1, 4, 6]
+
+    everywhere = read_firms_csv(path, bbox=None, min_confidence=0)
+    assert len(everywhere) == 6
+
+def test_acquisition_time_to_epoch(tmp_path):
+    path = write_csv(tmp_path, [
+        "latitude,longitude,brightness,confidence,frp,acq_date,acq_time",
+        "30,75,300,80,1,2025-11-01,0530",
+        "30,75,300,80,1,2025-11-01,5",
+        "30,75,300,80,1,2025-11-02,23:59",
+    ])
+    fires = read_firms_csv(path)
+    assert fires.acquired_at.dtype == np.int64
+    assert fires.acquired_at.tolist() == [
+        epoch("2025-11-01", 530), epoch("2025-11-01", 5), epoch("2025-11-02", 2359)
+    ]
+
+def test_acquisition_time_defaults_to_zero_without_columns(tmp_path):
+    path = write_csv(tmp_path, ["latitude,longitude,brightness,confidence,frp", "30,75,300,80,1"])
+    assert read_firms_csv(path).acquired_at.tolist() == [0]
+
+def test_malformed_rows_are_skipped(tmp_path):
+    path = write_csv(tmp_path, [
+        "latitude,longitude,brightness,confidence,frp,acq_date,acq_time",
+        "30,75,300,80,1,2025-11-01,0530",
+        "30,75,300",                          # truncated row
+        "north,75,300,80,2,2025-11-01,0530",  # non-numeric latitude
+        "30,75,300,sure,3,2025-11-01,0530",   # unknown confidence class
+        "30,75,hot,80,4,2025-11-01,0530",     # non-numeric brightness
+        "30,75,300,80,5,01/11/2025,0530",     # unparseable date
+        "",
+        "30,75,300,80,6,2025-11-01,0530",
+    ])
+    fires = read_firms_csv(path)
+    assert fires.frp.tolist() == [1, 6]
+
+def test_accepts_an_iterable_of_lines():
+    lines = ["latitude,longitude,brightness,confidence,frp", "30,75,300,80,1"]
+    assert len(read_firms_csv(lines)) == 1
@@ -0,0 +1,133 @@
+import numpy as np
+import pytest
+
+from fire_batch import FireBatch
+from fire_clustering import cluster_fires, cluster_labels
+from fire_engine import SatelliteFireDetector
+from incremental_clustering import IncrementalFireClusterer
+
+END_TIME = 1_730_419_200   # 2024-11-01 00:00 UTC
+
+def make_batch(lats, lon=75.0, frp=10.0, acquired_at=END_TIME):
+    n = len(lats)
+    return FireBatch(lats, np.full(n, lon), np.full(n, 330.0), np.full(n, frp), np.full(n, 80),
+                     np.broadcast_to(acquired_at, n), source="SIMULATED")
+
+def feed_pool(n=800, seed=7):
+    """Dense simulated detections with unique keys, so components merge and split."""
+    fires = SatelliteFireDetector().simulate_bulk_fires(n, seed=seed, bbox=(29.5, 31.5, 74.0, 76.5),
+                                                        hotspots=6, spread_km=12.0, end_time=END_TIME)
+    _, first = np.unique(np.array(fires.keys()), axis=0, return_index=True)
+    return fires[np.sort(first)]
+
+def tracked_partition(clusterer):
+    """Cluster id -> frozenset of detection keys."""
+    return {cid: frozenset(clusterer.key_of[s] for s in slots) for cid, slots in clusterer.members.items()}
+
+def batch_partition(batch, radius_km=20):
+    keys = batch.keys()
+    groups = {}
+    for key, label in zip(keys, cluster_labels(batch.latitude, batch.longitude, radius_km).tolist()):
+        groups.setdefault(label, set()).add(key)
+    return {frozenset(g) for g in groups.values()}
+
+def assert_matches_batch(clusterer, batch):
+    assert len(clusterer) == len(batch)
+    assert set(tracked_partition(clusterer).values()) == batch_partition(batch)
+    # Running sums agree with a from-scratch aggregation
+    incremental = sorted((c["fire_count"], c["total_frp"], c["center"])
+                         for c in clusterer.clusters(top_k=None))
+    batch_clusters = sorted((c["fire_count"], c["total_frp"], c["center"])
+                            for c in cluster_fires(batch, top_k=None))
+    assert incremental == batch_clusters
+
+def test_sync_rounds_match_batch_clustering():
+    pool = feed_pool()
+    rng = np.random.default_rng(0)
+    clusterer = IncrementalFireClusterer()
+    for _ in range(6):
+        feed = pool[rng.random(len(pool)) < 0.6]
+        clusterer.sync(feed)
+        assert_matches_batch(clusterer, feed)
+
+def test_expire_rounds_match_batch_clustering():
+    pool = feed_pool()
+    clusterer = IncrementalFireClusterer()
+    clusterer.insert(pool)
+    assert_matches_batch(clusterer, pool)
+    for hours_left in (18, 12, 6, 1):
+        cutoff = END_TIME - hours_left * 3600
+        remaining = pool[pool.acquired_at >= cutoff]
+        assert clusterer.expire(cutoff) == len(pool) - len(remaining)
+        assert_matches_batch(clusterer, remaining)
+        pool = remaining
+
+def test_unchanged_clusters_keep_their_ids():
+    pool = feed_pool()
+    rng = np.random.default_rng(1)
+    clusterer = IncrementalFireClusterer()
+    clusterer.sync(pool[rng.random(len(pool)) < 0.7])
+    kept = 0
+    for _ in range(5):
+        before = {keys: cid for cid, keys in tracked_partition(clusterer).items()}
+        clusterer.sync(pool[rng.random(len(pool)) < 0.7])
+        after = {keys: cid for cid, keys in tracked_partition(clusterer).items()}
+        for keys in before.keys() & after.keys():
+            assert before[keys] == after[keys]
+            kept += 1
+    assert kept > 0
+
+def test_merge_keeps_the_larger_id_and_split_gives_it_back():
+    # 0.1 degrees of latitude is about 11 km; radius is 20 km
+    clusterer = IncrementalFireClusterer(radius_km=20)
+    clusterer.insert(make_batch([30.00, 30.10]))
+    clusterer.insert(make_batch([30.40]))
+    left, right = sorted(tracked_partition(clusterer), key=lambda cid: -len(clusterer.members[cid]))
+    assert len(clusterer.members) == 2
+
+    bridge = make_batch([30.25])
+    clusterer.insert(bridge)
+    assert list(clusterer.members) == [left]
+    assert clusterer.clusters()[0]["fire_count"] == 4
+
+    clusterer.remove(bridge.keys())
+    assert len(clusterer.members) == 2
+    assert len(clusterer.members[left]) == 2
+    assert right not in clusterer.members   # the smaller fragment gets a fresh id
+
+def test_duplicate_keys_are_inserted_once():
+    clusterer = IncrementalFireClusterer()
+    batch = make_batch([30.0, 30.0])
+    assert clusterer.insert(batch) == 1
+    assert clusterer.insert(batch) == 0
+    assert len(clusterer) == 1
+
+def test_expire_keeps_detections_with_unknown_time():
+    clusterer = IncrementalFireClusterer()
+    clusterer.insert(make_batch([30.0, 31.0], acquired_at=0))
+    clusterer.insert(make_batch([30.5], acquired_at=END_TIME - 7200))
+    assert clusterer.expire(END_TIME) == 1
+    assert len(clusterer) == 2
+    assert sorted(key[2] for key in clusterer.slot_of) == [0, 0]
+
+def test_save_load_round_trip(tmp_path):
+    pool = feed_pool()
+    rng = np.random.default_rng(2)
+    clusterer = IncrementalFireClusterer()
+    clusterer.sync(pool[rng.random(len(pool)) < 0.6])
+    path = tmp_path / "clusters.pkl"
+    clusterer.save(path)
+    restored = IncrementalFireClusterer.load(path)
+
+    assert tracked_partition(restored) == tracked_partition(clusterer)
+    assert restored.clusters(top_k=None) == clusterer.clusters(top_k=None)
+    # Both continue identically from the saved state
+    feed = pool[rng.random(len(pool)) < 0.6]
+    assert restored.sync(feed) == clusterer.sync(feed)
+    assert tracked_partition(restored) == tracked_partition(clusterer)
+    assert_matches_batch(restored, feed)
+
+def test_rejects_detections_beyond_max_latitude():
+    clusterer = IncrementalFireClusterer(max_abs_lat=60.0)
+    with pytest.raises(ValueError):
+        clusterer.insert(make_batch([65.0]))
@@ -0,0 +1,45 @@
+import socket
+
+import numpy as np
+import pytest
+
+from fire_batch import FireBatch
+from firms_cache import FirmsFeedCache
+from nasa_live import fetch_live_nasa_data, fire_intensity, rank_fires
+
+def unreachable_url():
+    # A port nothing listens on: the download fails at once
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/MODIS_24h.csv"
+
+def batch():
+    return FireBatch(latitude=[30.0, 30.1, 30.2], longitude=[75.0, 75.1, 75.2], brightness=[380.0, 320.0, 300.0],
+                     frp=[15.0, 120.0, 60.0], confidence=[90, 70, 90], acquired_at=[0, 0, 0])
+
+def test_intensity_is_brightness_for_satellite_and_frp_for_simulated_fires():
+    fires = batch()
+    np.testing.assert_allclose(fire_intensity(fires), [0.95, 0.8, 0.75])
+    np.testing.assert_allclose(fire_intensity(fires, simulated=True), [0.1, 0.8, 0.4])
+
+    # Ranking by intensity follows whichever intensity was reported
+    assert rank_fires(fires, None, k=2, key="intensity") == [0, 1]
+    assert rank_fires(fires, None, k=2, key="intensity", intensity=fire_intensity(fires, simulated=True)) == [1, 2]
+    with pytest.raises(ValueError, match="Unknown fire rank key"):
+        rank_fires(fires, None, key="brightness")
+
+def test_simulated_fallback_reports_frp_intensity(tmp_path):
+    output_path = str(tmp_path / "fire_data.json")
+    data = fetch_live_nasa_data(url=unreachable_url(), output_path=output_path,
+                                cache=FirmsFeedCache(str(tmp_path / "cache")), fire_rank_key="intensity")
+
+    assert data["metadata"]["status"] == "Simulated"
+    fires = data["all_fires"]
+    assert 40 <= len(fires) <= 60
+    for fire in fires:
+        assert fire["intensity"] == pytest.approx(fire["frp"] / 150, abs=1e-3)
+        assert fire["confidence"] in (70, 90)
+    top = [f["intensity"] for f in data["impactful_fires"]]
+    assert top == sorted(top, reverse=True)
+    assert top[0] == max(f["intensity"] for f in fires)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from smoke_drift import WindField
+
+def linear_field(lats, lons):
+    """u = 10 * lat + lon and v = -lat, which bilinear interpolation reproduces exactly."""
+    grid_lat, grid_lon = np.meshgrid(lats, lons, indexing="ij")
+    return WindField(lats, lons, 10 * grid_lat + grid_lon, -grid_lat)
+
+@pytest.mark.parametrize("lats, lons", [
+    ([28.0, 29.0, 30.0], [76.0, 77.0, 78.0]),
+    ([30.0, 29.0, 28.0], [78.0, 77.0, 76.0]),   # north-to-south, as in ERA5/GRIB
+    ([29.0, 30.0, 28.0], [77.0, 76.0, 78.0]),
+])
+def test_interpolation_ignores_axis_order(lats, lons):
+    field = linear_field(np.array(lats), np.array(lons))
+    u, v = field.at(np.array([29.5, 28.2]), np.array([76.5, 77.9]))
+    np.testing.assert_allclose(u, [[371.5, 359.9]])
+    np.testing.assert_allclose(v, [[-29.5, -28.2]])
+
+def test_repeated_axis_values_are_rejected():
+    with pytest.raises(ValueError):
+        WindField([28.0, 28.0], [76.0, 77.0], np.zeros((2, 2)), np.zeros((2, 2)))
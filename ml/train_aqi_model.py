@@ -1,170 +1,208 @@
-import glob
-import pandas as pd
+# FILE: DELHI/ml/train_aqi_model.py
+import hashlib
 import json
 import os
-import re
+import datetime
 from xgboost import XGBRegressor
 import numpy as np
 
-print("🔹 Loading Excel files...")
+from aqi_features import (DIRECT_FEATURE_COLUMNS, FEATURE_COLUMNS, N_LAGS,
+                          build_direct_training_matrix, build_training_matrix, to_days)
+from aqi_forecast import LATEST_POINTER, MODEL_DIR, artifact_paths
 
 # Get absolute paths relative to the script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.path.join(SCRIPT_DIR, "data")
-OUTPUT_DIR = os.path.join(SCRIPT_DIR, "output")
 
-files = glob.glob(os.path.join(DATA_DIR, "*.xlsx"))
-dfs = []
-
-# Month mapping
-MONTH_MAP = {
-    'january': 1, 'february': 2, 'march': 3, 'april': 4,
-    'may': 5, 'june': 6, 'july': 7, 'august': 8,
-    'september': 9, 'october': 10, 'november': 11, 'december': 12
+MODEL_PARAMS = {
+    "n_estimators": 300,
+    "max_depth": 5,
+    "learning_rate": 0.05,
+    "objective": "reg:squarederror"
 }
 
-if not files:
-    print("❌ No Excel files found in data/ folder!")
-    exit(1)
-
-for file in files:
-    print(f"Processing {file}")
-    # Extract year from filename (e.g., ..._2022_...)
-    year_match = re.search(r'202[0-9]', file)
-    year = int(year_match.group()) if year_match else 2025
-    
-    try:
-        df_raw = pd.read_excel(file)
-    except Exception as e:
-        print(f"⚠️ Error reading {file}: {e}")
-        continue
-    
-    # Clean column names
-    df_raw.columns = [str(c).lower().strip() for c in df_raw.columns]
-    
-    # Filter for valid day rows (1-31) and stop before summary rows
-    if 'day' in df_raw.columns:
-        df_raw['day'] = pd.to_numeric(df_raw['day'], errors='coerce')
-        df_raw = df_raw.dropna(subset=['day'])
-        df_raw['day'] = df_raw['day'].astype(int)
-    else:
-        print(f"⚠️ 'Day' column missing in {file}. Skipping.")
-        continue
-
-    # Identify month columns
-    month_cols = [c for c in df_raw.columns if c in MONTH_MAP]
-    
-    # Melt the dataframe: Day | Month | AQI
-    df_melted = df_raw.melt(id_vars=['day'], value_vars=month_cols, 
-                             var_name='month_name', value_name='aqi')
-    
-    # Convert month name to number
-    df_melted['month'] = df_melted['month_name'].map(MONTH_MAP)
-    
-    # Create date column
-    def create_date(row):
-        try:
-            return pd.to_datetime(f"{year}-{row['month']}-{row['day']}")
-        except:
-            return pd.NaT
-
-    df_melted['date'] = df_melted.apply(create_date, axis=1)
-    
-    # Cleanup
-    df_processed = df_melted.dropna(subset=['date', 'aqi'])
-    df_processed = df_processed[['date', 'aqi']]
-    
-    dfs.append(df_processed)
-
-if not dfs:
-    print("❌ No valid data extracted from files!")
-    exit(1)
-
-df = pd.concat(dfs, ignore_index=True)
-df = df.sort_values("date")
-
-print("🔹 Total records:", len(df))
-
-# Convert AQI to numeric and interpolate missing values
-df["aqi"] = pd.to_numeric(df["aqi"], errors='coerce')
-df["aqi"] = df["aqi"].interpolate()
-df = df.dropna()
-
-# ----------------------
-# Feature Engineering
-# ----------------------
-print("🔹 Creating features...")
-
-df["aqi_lag1"] = df["aqi"].shift(1)
-df["aqi_lag2"] = df["aqi"].shift(2)
-df["aqi_lag3"] = df["aqi"].shift(3)
-
-df["month_feat"] = df["date"].dt.month
-df["dayofweek"] = df["date"].dt.dayofweek
-
-df = df.dropna()
-
-X = df[["aqi_lag1", "aqi_lag2", "aqi_lag3", "month_feat", "dayofweek"]]
-y = df["aqi"]
-
-# ----------------------
-# Train Model
-# ----------------------
-print("🔹 Training ML model...")
-
-model = XGBRegressor(
-    n_estimators=300,
-    max_depth=5,
-    learning_rate=0.05,
-    objective="reg:squarederror"
-)
-
-model.fit(X, y)
-
-print("✅ Model trained successfully.")
-
-# ----------------------
-# Forecast Next 7 Days
-# ----------------------
-print("🔹 Generating forecast...")
-
-last = df.iloc[-1:].copy()
-now_date = df["date"].iloc[-1]
-forecast_results = []
-
-for i in range(1, 8):
-    pred = float(model.predict(last[X.columns])[0])
-    future_date = now_date + pd.Timedelta(days=i)
-    
-    forecast_results.append({
-        "date": future_date.strftime("%Y-%m-%d"),
-        "aqi": round(pred, 2)
-    })
-
-    # Update last row for next prediction
-    new_data = {
-        "aqi_lag1": [pred],
-        "aqi_lag2": [last["aqi_lag1"].iloc[0]],
-        "aqi_lag3": [last["aqi_lag2"].iloc[0]],
-        "month_feat": [future_date.month],
-        "dayofweek": [future_date.dayofweek]
+# Warm-start policy: daily runs add a few trees fitted on a recent window
+# on top of the previous booster. A full retrain happens when there is no
+# usable previous model, history was revised, the booster hits MAX_TREES,
+# or the rolling day-ahead MAE on unseen days drifts past the holdout MAE
+# recorded at the last full retrain by more than DRIFT_TOLERANCE.
+VALIDATION_DAYS = 30
+WARM_START_TREES = 20
+WARM_START_WINDOW_DAYS = 90
+MAX_TREES = 600
+DRIFT_TOLERANCE = 0.25
+MIN_DRIFT_SAMPLES = 7
+
+def training_rows(dates, aqi, strategy="recursive", max_horizon=7):
+    """(X, y, target_dates, feature names) for the given strategy."""
+    if strategy == "direct":
+        X, y, targets = build_direct_training_matrix(dates, aqi, max_horizon)
+        return X, y, targets, DIRECT_FEATURE_COLUMNS
+    X, y, targets = build_training_matrix(dates, aqi)
+    return X, y, targets, FEATURE_COLUMNS
+
+def fit_booster(X, y, features, params=MODEL_PARAMS, base=None):
+    """Fits a new booster, or keeps boosting on top of base when given."""
+    if base is not None:
+        # Training matrices are plain NumPy; names are re-attached below
+        base = base.copy()
+        base.feature_names = None
+    model = XGBRegressor(**params)
+    model.fit(X, y, xgb_model=base)
+    booster = model.get_booster()
+    booster.feature_names = list(features)
+    return booster
+
+def train_model(dates, aqi, params=MODEL_PARAMS, strategy="recursive", max_horizon=7):
+    """
+    Fits either a day-ahead model used recursively, or a direct model with
+    a horizon feature covering 1..max_horizon days in one predict.
+    """
+    print("🔹 Creating features...")
+    X, y, _, features = training_rows(dates, aqi, strategy, max_horizon)
+
+    print(f"🔹 Training ML model ({strategy})...")
+    booster = fit_booster(X, y, features, params)
+
+    print("✅ Model trained successfully.")
+    return booster, len(y)
+
+def day_ahead_errors(booster, dates, aqi, features, after=None):
+    """Absolute day-ahead errors for target days after `after` (all days if None)."""
+    X, y, targets = build_direct_training_matrix(dates, aqi, 1)
+    if after is not None:
+        keep = targets > to_days(after)
+        X, y = X[keep], y[keep]
+    if not len(y):
+        return np.empty(0)
+    return np.abs(booster.inplace_predict(X[:, :len(features)]) - y)
+
+def error_summary(errors, kind):
+    return {
+        "kind": kind,
+        "days": int(len(errors)),
+        "mae": round(float(np.mean(errors)), 3),
+        "rmse": round(float(np.sqrt(np.mean(errors ** 2))), 3)
     }
-    last = pd.DataFrame(new_data)
-
-# ----------------------
-# Save Output
-# ----------------------
-output = {
-    "model": "XGBoost Regression",
-    "data_source": "CPCB AQI (Excel Pivoted Format)",
-    "forecast_days": 7,
-    "aqi_forecast": forecast_results
-}
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-output_path = os.path.join(OUTPUT_DIR, "aqi_forecast.json")
+def holdout_validation(dates, aqi, params=MODEL_PARAMS, strategy="recursive", max_horizon=7,
+                       days=VALIDATION_DAYS):
+    """Day-ahead error on the last `days` days of a model fitted without them."""
+    cutoff = to_days(dates[-1]) - days
+    X, y, targets, features = training_rows(dates, aqi, strategy, max_horizon)
+    booster = fit_booster(X[targets <= cutoff], y[targets <= cutoff], features, params)
+    return error_summary(day_ahead_errors(booster, dates, aqi, features, after=cutoff), "holdout")
+
+def series_digest(dates, aqi, end):
+    """sha256 of the series up to end, to detect revised history."""
+    keep = to_days(dates) <= to_days(end)
+    digest = hashlib.sha256(to_days(dates)[keep].tobytes())
+    digest.update(np.asarray(aqi, dtype=np.float64)[keep].tobytes())
+    return digest.hexdigest()
+
+def retrain_plan(previous, dates, aqi, params=MODEL_PARAMS, strategy="recursive", max_horizon=None):
+    """("full" | "incremental" | "skip", reason) for updating previous on this series."""
+    if previous is None:
+        return "full", "no previous model"
+    schema = previous.schema
+    if (schema.get("strategy", "recursive"), schema.get("max_horizon")) != (strategy, max_horizon) \
+            or schema.get("params") != params:
+        return "full", "strategy or parameters changed"
+    if "data_sha256" not in schema or "reference_mae" not in schema:
+        return "full", "previous model has no warm-start metadata"
+    if series_digest(dates, aqi, schema["train_end"]) != schema["data_sha256"]:
+        return "full", "history before the last training run changed"
+    if to_days(dates[-1]) <= to_days(schema["train_end"]):
+        return "skip", f"no data after {schema['train_end']}"
+    if previous.booster.num_boosted_rounds() + WARM_START_TREES > MAX_TREES:
+        return "full", f"tree cap of {MAX_TREES} reached"
+    return "incremental", f"new data after {schema['train_end']}"
+
+def full_retrain(dates, aqi, params=MODEL_PARAMS, strategy="recursive", max_horizon=7):
+    validation = holdout_validation(dates, aqi, params, strategy, max_horizon)
+    print(f"🔹 Holdout day-ahead MAE over the last {validation['days']} days: {validation['mae']}")
+    booster, n_rows = train_model(dates, aqi, params, strategy, max_horizon)
+    return booster, n_rows, {
+        "training_mode": "full",
+        "validation": validation,
+        "reference_mae": validation["mae"],
+        "recent_errors": []
+    }
+
+def warm_start(previous, dates, aqi, params=MODEL_PARAMS, strategy="recursive", max_horizon=7):
+    """
+    Scores the previous booster on the days it has never seen, then adds
+    WARM_START_TREES trees fitted on the last WARM_START_WINDOW_DAYS.
+    Returns None when the rolling error has drifted and a full retrain is due.
+    """
+    schema = previous.schema
+    features = previous.features
+    new_errors = day_ahead_errors(previous.booster, dates, aqi, features, after=schema["train_end"])
+    recent = np.concatenate([schema.get("recent_errors", []), new_errors])[-VALIDATION_DAYS:]
+    validation = error_summary(recent, "prequential")
+    print(f"🔹 Day-ahead MAE over the last {validation['days']} unseen days: {validation['mae']} "
+          f"(reference {schema['reference_mae']})")
+    if len(recent) >= MIN_DRIFT_SAMPLES and validation["mae"] > schema["reference_mae"] * (1 + DRIFT_TOLERANCE):
+        print(f"⚠️ Error drifted more than {DRIFT_TOLERANCE:.0%} above reference, retraining from scratch")
+        return None
+
+    X, y, targets, _ = training_rows(dates, aqi, strategy, max_horizon or 7)
+    window = targets > to_days(dates[-1]) - WARM_START_WINDOW_DAYS
+    print(f"🔹 Warm-starting {previous.version} with {WARM_START_TREES} trees on {int(window.sum())} recent rows...")
+    booster = fit_booster(X[window], y[window], features, {**params, "n_estimators": WARM_START_TREES},
+                          base=previous.booster)
+    print("✅ Model updated successfully.")
+    return booster, schema["trained_rows"] + len(new_errors), {
+        "training_mode": "incremental",
+        "parent_version": previous.version,
+        "validation": validation,
+        "reference_mae": schema["reference_mae"],
+        "recent_errors": [round(float(e), 3) for e in recent]
+    }
+
+def save_artifact(booster, dates, aqi, n_rows, params=MODEL_PARAMS, model_dir=MODEL_DIR,
+                  strategy="recursive", max_horizon=None, **extra):
+    """
+    Writes the booster and its feature schema under a new version and
+    points latest.json at it. The schema carries the tail of the series
+    so inference can roll forward without touching the source data.
+    """
+    version = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    os.makedirs(model_dir, exist_ok=True)
+    model_path, schema_path = artifact_paths(model_dir, version)
+
+    booster.save_model(model_path)
+    schema = {
+        "version": version,
+        "model": "XGBoost Regression",
+        "model_file": os.path.basename(model_path),
+        "strategy": strategy,
+        "max_horizon": max_horizon,
+        "features": list(booster.feature_names),
+        "params": params,
+        "trained_rows": n_rows,
+        "trees": booster.num_boosted_rounds(),
+        "train_start": str(dates[0]),
+        "train_end": str(dates[-1]),
+        "data_sha256": series_digest(dates, aqi, dates[-1]),
+        "last_observations": {
+            "date": str(dates[-1]),
+            "aqi": [float(v) for v in aqi[-N_LAGS:]]
+        },
+        **extra
+    }
+    with open(schema_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    with open(os.path.join(model_dir, LATEST_POINTER), "w") as f:
+        json.dump({"version": version}, f)
+
+    print(f"💾 Model artifact {version} saved to {os.path.relpath(model_path, SCRIPT_DIR)}")
+    return version
+
+def main(argv=None):
+    # Loading, training policy and forecast output live in aqi_pipeline
+    from aqi_pipeline import main as pipeline_main
 
-with open(output_path, "w") as f:
-    json.dump(output, f, indent=2)
+    pipeline_main(argv)
 
-print("🎉 Forecast saved to output/aqi_forecast.json")
+if __name__ == "__main__":
+    main()